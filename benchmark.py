@@ -0,0 +1,492 @@
+import os
+import sys
+import json
+import math
+import time
+import random
+import shutil
+import argparse
+import platform
+import tempfile
+import contextlib
+import subprocess
+import importlib.util
+
+from typing import Callable, Dict, Iterator, List, Optional
+
+import gedit_simulation
+
+
+def legacy_load_words() -> List[str]:
+    # load_words() as it was before the dictionary cache, kept as a reference
+    try:
+        json_path = os.path.join(
+            '/opt/ghosts',
+            os.listdir('/opt/ghosts')[0],
+            'ghosts-client/config/dictionary.json'
+        )
+        with open(json_path, 'r', encoding='utf-8-sig') as file:
+            words = json.load(file)
+    except Exception:
+        with open('dictionary.json', 'r', encoding='utf-8-sig') as file:
+            words = json.load(file)
+    return [str(word) for word in words]
+
+
+def measure(function: Callable, repeat: int, setup: Callable = None) -> float:
+    # Best time (in seconds) of a call to function, running setup before each call
+    best = float('inf')
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_load_words(repeat: int) -> Dict[str, float]:
+    json_path = gedit_simulation.find_dictionary()
+    cache_path = json_path + gedit_simulation.DICTIONARY_CACHE_SUFFIX
+
+    def reset():
+        gedit_simulation._words = None
+
+    def reset_cold():
+        reset()
+        if os.path.exists(cache_path):
+            os.remove(cache_path)
+
+    results = {
+        'legacy_per_call_ms': measure(legacy_load_words, repeat) * 1000,
+        'cold_start_ms': measure(gedit_simulation.load_words, repeat, reset_cold) * 1000,
+        'warm_start_ms': measure(gedit_simulation.load_words, repeat, reset) * 1000,
+    }
+    gedit_simulation.load_words()
+    results['per_call_ms'] = measure(gedit_simulation.load_words, repeat) * 1000
+    return results
+
+
+def bench_generate_text(repeat: int, count: int = 2000) -> Dict[str, float]:
+    words = gedit_simulation.load_words()
+    params = (2, 4, 2, 10, 4, 15)
+
+    def throughput(generate: Callable[[], List[str]]) -> float:
+        # Best throughput (in MB/s of generated text) over the repetitions
+        best = 0.0
+        for _ in range(repeat):
+            start = time.perf_counter()
+            texts = generate()
+            elapsed = time.perf_counter() - start
+            best = max(best, sum(len(text.encode('utf-8')) for text in texts) / elapsed / 1e6)
+        return best
+
+    results = {
+        'legacy_mb_per_s': throughput(lambda: [gedit_simulation.generate_text(words, *params) for _ in range(count)]),
+    }
+    generator = gedit_simulation.BulkTextGenerator(words, *params, seed=0, use_numpy=False)
+    results['bulk_python_mb_per_s'] = throughput(lambda: generator.generate(count))
+    try:
+        generator = gedit_simulation.BulkTextGenerator(words, *params, seed=0, use_numpy=True)
+        results['bulk_numpy_mb_per_s'] = throughput(lambda: generator.generate(count))
+    except ImportError:
+        pass
+    return results
+
+
+# (min_paragraphs, max_paragraphs, min_sentences, max_sentences, min_words, max_words)
+TEXT_RANGES = {
+    'short': (1, 1, 1, 3, 2, 5),
+    'default': (2, 4, 2, 10, 4, 15),
+    'long': (5, 10, 10, 20, 10, 25),
+}
+
+
+def bench_text_ranges(repeat: int, count: int = 200) -> Dict[str, float]:
+    # Throughput of generate_paragraph() and generate_text() (the functions used by the actions) per range
+    words = gedit_simulation.load_words()
+    results = {}
+    for name, params in TEXT_RANGES.items():
+        paragraph = measure(lambda: [gedit_simulation.generate_paragraph(words, *params[2:]) for _ in range(count)], repeat)
+        text = measure(lambda: [gedit_simulation.generate_text(words, *params) for _ in range(count)], repeat)
+        results[f'{name}_paragraphs_per_s'] = count / paragraph
+        results[f'{name}_texts_per_s'] = count / text
+    return results
+
+
+def bench_generate_filename(repeat: int, count: int = 10000) -> Dict[str, float]:
+    results = {}
+    for low, high in [(5, 10), (20, 40)]:
+        elapsed = measure(lambda: [gedit_simulation.generate_filename(low, high) for _ in range(count)], repeat)
+        results[f'length{low}_{high}_names_per_s'] = count / elapsed
+        permutation = gedit_simulation.FilenamePermutation(low, high)
+        elapsed = measure(lambda: [permutation.name(low, index) for index in range(count)], repeat)
+        results[f'length{low}_{high}_distinct_names_per_s'] = count / elapsed
+    return results
+
+
+DIRECTORY_SIZES = [10000, 100000]
+
+
+def legacy_choose_file(directory: str) -> str:
+    # Choice of the input file as it was before the file pools: a listing of the directory per action
+    files = [file for file in os.listdir(directory) if file.endswith('.txt')]
+    return os.path.join(directory, random.choice(files))
+
+
+def bench_choose_file(repeat: int, picks: int = 10000) -> Dict[str, float]:
+    # Selection of the input file in directories of many (empty) files
+    results = {}
+    for size in DIRECTORY_SIZES:
+        with tempfile.TemporaryDirectory() as directory:
+            for index in range(size):
+                open(os.path.join(directory, f'{index}.txt'), 'w').close()
+
+            results[f'legacy_{size}_ms'] = measure(lambda: legacy_choose_file(directory), max(1, repeat // 10)) * 1000
+            # What a one-shot run (cron) does
+            results[f'one_shot_{size}_ms'] = measure(lambda: gedit_simulation.DirectoryListing(directory).pick(), max(1, repeat // 10)) * 1000
+            for selection in ['uniform', 'recent']:
+                scan = measure(lambda: gedit_simulation.FilePool(directory, selection=selection), max(1, repeat // 10))
+                pool = gedit_simulation.FilePool(directory, selection=selection)
+                pick = measure(lambda: [gedit_simulation.choose_input_file(directory, pool) for _ in range(picks)], repeat)
+                results[f'{selection}_{size}_scan_ms'] = scan * 1000
+                results[f'{selection}_{size}_picks_per_s'] = picks / pick
+    return results
+
+
+def bench_markov(repeat: int, corpus_size: int = 2000) -> Dict[str, float]:
+    # Corpus of generated texts (about 2 MB), the model is built and sampled from a temporary directory
+    words = gedit_simulation.load_words()
+    generator = gedit_simulation.BulkTextGenerator(words, 2, 4, 2, 10, 4, 15, seed=0)
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        corpus_dir = os.path.join(directory, 'corpus')
+        os.makedirs(corpus_dir)
+        for index, text in enumerate(generator.generate(corpus_size)):
+            with open(os.path.join(corpus_dir, f'{index}.txt'), 'w') as file:
+                file.write(text)
+
+        model_path = os.path.join(directory, 'markov.model')
+        for order in [1, 2]:
+            build_time = measure(lambda: gedit_simulation.build_markov_model(corpus_dir, model_path, order), max(1, repeat // 10))
+            model = gedit_simulation.MarkovModel(model_path)
+            rng = random.Random(0)
+            tokens = 100000
+            start = time.perf_counter()
+            model.generate_sentence(tokens, rng)
+            elapsed = time.perf_counter() - start
+
+            results[f'order{order}_build_s'] = build_time
+            results[f'order{order}_model_kb'] = os.path.getsize(model_path) / 1024
+            results[f'order{order}_tokens_per_s'] = tokens / elapsed
+            del model
+    return results
+
+
+# Modules that a command without GUI actions must not import
+HEAVY_MODULES = ['pyautogui', 'pyperclip', 'asyncio', 'numpy', 'concurrent.futures.process',
+                 'logging.handlers', 'subprocess', 'json', 'hashlib', 'mmap']
+
+
+def bench_startup(repeat: int) -> Dict[str, float]:
+    # Wall time of a no-op command ("random" that exits because of --execution), as run by cron
+    script = os.path.abspath(gedit_simulation.__file__)
+    env = dict(os.environ)
+    env.pop('PYTHONDONTWRITEBYTECODE', None)
+
+    def run(command: List[str]) -> Callable[[], None]:
+        return lambda: subprocess.run(command, check=True, capture_output=True, env=env, cwd=os.path.dirname(script))
+
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        arguments = ['random', '--execution', '0', '--input', directory, '--output', directory, '--log', directory]
+        results['python_ms'] = measure(run([sys.executable, '-c', 'pass']), repeat) * 1000
+        # The script is compiled on every run, the module is loaded from its cached bytecode
+        results['script_noop_ms'] = measure(run([sys.executable, script] + arguments), repeat) * 1000
+        results['module_noop_ms'] = measure(run([sys.executable, '-m', 'gedit_simulation'] + arguments), repeat) * 1000
+
+        check = (f"import sys, runpy; sys.argv = ['gedit_simulation'] + {arguments!r}\n"
+                 f"try: runpy.run_module('gedit_simulation', run_name='__main__')\n"
+                 f"except SystemExit: pass\n"
+                 f"print(sum(module in sys.modules for module in {HEAVY_MODULES!r}))")
+        output = subprocess.run([sys.executable, '-c', check], check=True, capture_output=True, text=True, env=env, cwd=os.path.dirname(script)).stdout
+        results['heavy_modules'] = float(output.split()[-1])
+    return results
+
+
+# Fake gedit and wmctrl for the end-to-end cycles: every window is a file named after its id in the
+# windows directory (holding its title), next to a file with the path it edits, and the active window
+# is written to a file. The fake pyautogui below types into the active window and saves and closes it.
+FAKE_GEDIT = """#!/bin/sh
+id=$(printf '0x%08x' $$)
+echo "$(basename -- "$1") - gedit" > "$FAKE_DESKTOP/windows/$id"
+echo "$1" > "$FAKE_DESKTOP/paths/$id"
+"""
+FAKE_WMCTRL = """#!/bin/sh
+case "$1" in
+    -lx|-lp)
+        # The fake windows belong to no process (pid 0)
+        [ "$1" = -lx ] && column=gedit.Gedit || column=0
+        for window in "$FAKE_DESKTOP"/windows/*; do
+            [ -e "$window" ] || continue
+            echo "$(basename "$window")  0 $column  benchmark $(cat "$window")"
+        done;;
+    -ia)
+        echo "$2" > "$FAKE_DESKTOP/active";;
+    -ic)
+        rm -f "$FAKE_DESKTOP/windows/$2";;
+esac
+"""
+
+
+class FakePyAutoGUI:
+    # The part of pyautogui used by the GUI backend, editing the files of the fake windows
+    def __init__(self, desktop: str):
+        self.desktop = desktop
+        self.buffers = {}
+
+    def active(self) -> str:
+        with open(os.path.join(self.desktop, 'active')) as file:
+            return file.read().strip()
+
+    def buffer(self) -> List[str]:
+        window_id = self.active()
+        if window_id not in self.buffers:
+            with open(os.path.join(self.desktop, 'paths', window_id)) as file:
+                path = file.read().strip()
+            text = ''
+            if os.path.exists(path):
+                with open(path) as file:
+                    text = file.read()
+            self.buffers[window_id] = (path, list(text))
+        return self.buffers[window_id][1]
+
+    def write(self, text: str, interval: float = 0.0, _pause: bool = True):
+        self.buffer().extend(text)
+
+    def press(self, key: str, presses: int = 1, interval: float = 0.0, _pause: bool = True):
+        buffer = self.buffer()
+        if key == 'backspace':
+            del buffer[-1:]
+        else:
+            buffer.append('\n' if key == 'enter' else key)
+
+    def hotkey(self, *keys: str):
+        window_id = self.active()
+        if keys == ('ctrl', 's'):
+            self.buffer()
+            path, buffer = self.buffers[window_id]
+            with open(path, 'w') as file:
+                file.write(''.join(buffer))
+        elif keys in [('alt', 'f4'), ('ctrl', 'w')]:
+            self.buffers.pop(window_id, None)
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(os.path.join(self.desktop, 'windows', window_id))
+
+    def sleep(self, seconds: float):
+        # The fixed waits are not what is measured
+        pass
+
+
+@contextlib.contextmanager
+def fake_desktop():
+    with tempfile.TemporaryDirectory() as desktop:
+        bin_dir = os.path.join(desktop, 'bin')
+        for directory in [bin_dir, os.path.join(desktop, 'windows'), os.path.join(desktop, 'paths')]:
+            os.makedirs(directory)
+        for name, script in [('gedit', FAKE_GEDIT), ('wmctrl', FAKE_WMCTRL)]:
+            with open(os.path.join(bin_dir, name), 'w') as file:
+                file.write(script)
+            os.chmod(os.path.join(bin_dir, name), 0o755)
+
+        environ = dict(os.environ)
+        previous = gedit_simulation.pyautogui
+        os.environ['PATH'] = bin_dir + os.pathsep + os.environ['PATH']
+        os.environ['FAKE_DESKTOP'] = desktop
+        gedit_simulation.pyautogui = FakePyAutoGUI(desktop)
+        try:
+            yield
+        finally:
+            gedit_simulation.pyautogui = previous
+            os.environ.clear()
+            os.environ.update(environ)
+
+
+def bench_cycles(repeat: int) -> Dict[str, float]:
+    # Mean time (in ms) of each action of create/edit/view/delete cycles run by the GUI backend against
+    # the fake desktop: the overhead of the pipeline (generation, window polling, saving) without gedit
+    params = TEXT_RANGES['default']
+    words = gedit_simulation.load_words()
+    times = {verb: 0.0 for verb in ['create', 'edit', 'view', 'delete']}
+    with fake_desktop(), tempfile.TemporaryDirectory() as directory:
+        backend = gedit_simulation.GuiBackend()
+        actions = {
+            'create': lambda: gedit_simulation.create_process(directory, *params, 5, 10, 0, words, backend),
+            'edit': lambda: gedit_simulation.edit_process(directory, *params, 0, words, backend),
+            'view': lambda: gedit_simulation.view_process(directory, 1, 1, backend=backend),
+            'delete': lambda: gedit_simulation.delete_process(directory, backend),
+        }
+        for _ in range(repeat):
+            for verb, action in actions.items():
+                start = time.perf_counter()
+                action()
+                times[verb] += time.perf_counter() - start
+        if os.listdir(directory):
+            raise RuntimeError(f"The cycles left files behind in {directory}")
+    return {f'{verb}_ms': total / repeat * 1000 for verb, total in times.items()}
+
+
+WINDOW_MANAGERS = ['openbox', 'fluxbox', 'matchbox-window-manager', 'metacity', 'xfwm4']
+
+
+@contextlib.contextmanager
+def xvfb_display(window_manager: str) -> Iterator[str]:
+    # A virtual display with a window manager (needed by wmctrl)
+    server = subprocess.Popen(['Xvfb', '-displayfd', '1', '-screen', '0', '1280x1024x24', '-nolisten', 'tcp'], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    display = f':{server.stdout.readline().decode().strip()}'
+    manager = subprocess.Popen([window_manager], env=dict(os.environ, DISPLAY=display), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        time.sleep(1)
+        yield display
+    finally:
+        manager.terminate()
+        server.terminate()
+        manager.wait()
+        server.wait()
+
+
+def bench_xvfb_cycles(repeat: int) -> Dict[str, float]:
+    # Mean wall time (in ms) of each command, with gedit, under Xvfb (skipped if anything is missing)
+    window_manager = next(filter(shutil.which, WINDOW_MANAGERS), None)
+    missing = [tool for tool in ['Xvfb', 'gedit', 'wmctrl'] if not shutil.which(tool)]
+    if window_manager is None:
+        missing.append(f"a window manager ({', '.join(WINDOW_MANAGERS)})")
+    if importlib.util.find_spec('pyautogui') is None:
+        missing.append('pyautogui')
+    if missing:
+        print(f"xvfb_cycles skipped, missing: {', '.join(missing)}", file=sys.stderr)
+        return {}
+
+    cycles = max(1, repeat // 10)
+    script_dir = os.path.dirname(os.path.abspath(gedit_simulation.__file__))
+    times = {verb: 0.0 for verb in ['create', 'edit', 'view', 'delete']}
+    with xvfb_display(window_manager) as display, tempfile.TemporaryDirectory() as directory:
+        env = dict(os.environ, DISPLAY=display)
+        documents = os.path.join(directory, 'documents')
+        os.makedirs(documents)
+        log = ['--log', os.path.join(directory, 'log')]
+        text = ['--min-paragraphs', '1', '--max-paragraphs', '1', '--min-sentences', '1', '--max-sentences', '3',
+                '--interval-between-keystrokes', '0.005']
+        commands = {
+            'create': ['create', '--output', documents, *text, *log],
+            'edit': ['edit', '--input', documents, *text, *log],
+            'view': ['view', '--input', documents, '--time', '1', *log],
+            'delete': ['delete', '--input', documents, *log],
+        }
+        for _ in range(cycles):
+            for verb, arguments in commands.items():
+                start = time.perf_counter()
+                subprocess.run([sys.executable, '-m', 'gedit_simulation', *arguments], check=True, capture_output=True, env=env, cwd=script_dir)
+                times[verb] += time.perf_counter() - start
+    return {f'{verb}_ms': total / cycles * 1000 for verb, total in times.items()}
+
+
+BENCHMARKS = {
+    'load_words': bench_load_words,
+    'generate_text': bench_generate_text,
+    'text_ranges': bench_text_ranges,
+    'generate_filename': bench_generate_filename,
+    'choose_file': bench_choose_file,
+    'markov': bench_markov,
+    'startup': bench_startup,
+    'cycles': bench_cycles,
+    'xvfb_cycles': bench_xvfb_cycles,
+}
+
+
+def higher_is_better(metric: str) -> bool:
+    # Throughputs are "_per_s", everything else (times, sizes, counts of modules) should go down
+    return metric.endswith('_per_s')
+
+
+def compare(results: Dict[str, float], baseline: Dict[str, float], threshold: float) -> List[str]:
+    # Print the change of every metric measured in both runs and return the regressions beyond threshold (in %)
+    regressions = []
+    for metric in sorted(results.keys() & baseline.keys()):
+        before, after = baseline[metric], results[metric]
+        if before:
+            change = (after - before) / before * 100
+        else:
+            # Any change from a zero baseline (e.g. startup.heavy_modules) is infinitely large
+            change = math.copysign(math.inf, after) if after else 0.0
+        worse = -change if higher_is_better(metric) else change
+        flag = ''
+        if worse > threshold:
+            regressions.append(metric)
+            flag = '  REGRESSION'
+        print(f"{metric}: {before:.4f} -> {after:.4f} ({change:+.1f}%){flag}")
+    return regressions
+
+
+def git_commit() -> Optional[str]:
+    result = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                            cwd=os.path.dirname(os.path.abspath(__file__)))
+    return result.stdout.strip() or None
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog='gedit-simulation-benchmark',
+        description='Benchmark the hot paths of gedit-simulation.',
+    )
+    parser.add_argument('benchmarks', nargs='*', help=f'Benchmarks to run (all by default): {", ".join(BENCHMARKS)}.')
+    parser.add_argument('--repeat', '-r', type=int, default=20, help='Number of repetitions of each measurement.')
+    parser.add_argument('--json', type=str, default=None, help='File to write the results to as JSON ("-" for the standard output), to be used as a baseline by --compare.')
+    parser.add_argument('--compare', type=str, default=None, help='JSON results (written by --json) to compare with. Exits with status 1 if a metric regressed beyond --threshold.')
+    parser.add_argument('--threshold', type=float, default=10, help='Change (in percent) in the wrong direction above which a metric is a regression.')
+    args = parser.parse_args()
+
+    unknown = [name for name in args.benchmarks if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"Unknown benchmarks: {', '.join(unknown)}")
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)['results']
+
+    results = {}
+    for name in args.benchmarks or BENCHMARKS:
+        for metric, value in BENCHMARKS[name](args.repeat).items():
+            results[f'{name}.{metric}'] = value
+            if args.json != '-' and baseline is None:
+                print(f"{name}.{metric}: {value:.4f}")
+
+    if args.json:
+        report = {
+            'metadata': {
+                'time': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+                'commit': git_commit(),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'cpus': os.cpu_count(),
+                'repeat': args.repeat,
+            },
+            'results': results,
+        }
+        if args.json == '-':
+            json.dump(report, sys.stdout, indent=2)
+            print()
+        else:
+            with open(args.json, 'w') as file:
+                json.dump(report, file, indent=2)
+
+    if baseline is not None:
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regressions beyond {args.threshold}%: {', '.join(regressions)}", file=sys.stderr)
+            exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,26 +1,61 @@
+from __future__ import annotations
+
 import os
-import json
 import random
-import subprocess
 import string
 import re
 import argparse
 import logging
+import math
+import signal
+import threading
+import struct
+import array
+import bisect
+import contextlib
+import contextvars
+import collections
+import queue
+import atexit
+import importlib
+
+import sys
 
 from sys import exit
-from typing import List, Optional
-from logging.handlers import RotatingFileHandler
+from itertools import accumulate
+from functools import partial
+from operator import is_not
+from time import monotonic, perf_counter, sleep
+from typing import Callable, Collection, List, Optional, Tuple, TypeVar
+
+T = TypeVar('T')
 
 path = os.path.join(os.path.expanduser('~'), ".config", "gedit-simulation")
-os.makedirs(path, exist_ok=True)
 
-try:
-    import pyautogui
-    import pyperclip
-except Exception as e:
+
+class LazyModule:
+    # Imported on first use: pyautogui alone (with pyscreeze, Pillow, pymsgbox...) takes longer
+    # to import than most commands take to run, and only the GUI actions need it
+    def __init__(self, name: str, on_error: Optional[Callable[[Exception], None]] = None):
+        self.name = name
+        self.on_error = on_error
+        self.module = None
+
+    def __getattr__(self, attribute: str):
+        if self.module is None:
+            try:
+                self.module = importlib.import_module(self.name)
+            except Exception as e:
+                if self.on_error:
+                    self.on_error(e)
+                raise
+        return getattr(self.module, attribute)
+
+
+def gui_import_error(e: Exception):
     import traceback
-    import datetime
-    
+
+    os.makedirs(path, exist_ok=True)
     error_file = os.path.join(path, "error_gedit-simulation.log")
     with open(error_file, "a") as file:
         file.write("Date and time: \n")
@@ -35,6 +70,19 @@ except Exception as e:
         file.write("Environment variables: \n")
         file.write(str(os.environ))
         file.write("\n\n")
+    raise ActionError(f"The GUI libraries could not be imported: {e}") from e
+
+
+pyautogui = LazyModule('pyautogui', gui_import_error)
+pyperclip = LazyModule('pyperclip', gui_import_error)
+asyncio = LazyModule('asyncio')
+# Not needed by a run that does nothing (the annotations are not evaluated, see the __future__ import)
+subprocess = LazyModule('subprocess')
+json = LazyModule('json')
+datetime = LazyModule('datetime')
+hashlib = LazyModule('hashlib')
+shutil = LazyModule('shutil')
+mmap = LazyModule('mmap')
 
 
 format_str = '%(asctime)s - %(levelname)s - %(message)s'
@@ -46,6 +94,295 @@ console_handler.setFormatter(formatter)
 console_handler.setLevel(logging.WARNING)
 logger.addHandler(console_handler)
 
+# The log file is written by a QueueListener thread, so that logging never blocks the actions.
+# Records are written in batches, as JSON lines (or as text, --log-format text), and the file is
+# rotated by size and/or age, the old files being optionally compressed with gzip.
+LOG_FORMATS = ['json', 'text']
+LOG_FILES = {'json': 'gedit-simulation.jsonl', 'text': 'gedit-simulation.log'}
+LOG_BATCH_SIZE = 64  # Records written at once
+LOG_FLUSH_INTERVAL = 1  # Maximum time (in seconds) a record waits in the batch
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': datetime.datetime.fromtimestamp(record.created).isoformat(),
+            'level': record.levelname,
+            'message': record.getMessage(),
+        }
+        # Fields of the actions (see log_action)
+        entry.update(getattr(record, 'action', None) or {})
+        return json.dumps(entry)
+
+
+class BatchedFileHandler(logging.Handler):
+    def __init__(
+            self,
+            filename: str,
+            max_bytes: int = 0,
+            backups: int = 10,
+            interval: float = 0,
+            compress: bool = False,
+            batch_size: int = LOG_BATCH_SIZE,
+            flush_interval: float = LOG_FLUSH_INTERVAL
+        ):
+        super().__init__()
+        self.filename = filename
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.interval = interval
+        self.compress = compress
+        self.batch_size = batch_size
+        self.buffer: List[str] = []
+        self.open()
+
+        # Flush the records of a quiet period too
+        self.closed = threading.Event()
+        self.flusher = threading.Thread(target=self.flush_periodically, args=(flush_interval,), daemon=True)
+        self.flusher.start()
+
+    def open(self):
+        self.stream = open(self.filename, 'a', encoding='utf-8')
+        self.rollover_at = datetime.datetime.now().timestamp() + self.interval if self.interval else None
+
+    def emit(self, record: logging.LogRecord):
+        try:
+            self.buffer.append(self.format(record) + '\n')
+        except Exception:
+            self.handleError(record)
+            return
+        if len(self.buffer) >= self.batch_size or record.levelno >= logging.ERROR:
+            self.flush()
+
+    def flush(self):
+        self.acquire()
+        try:
+            if not self.buffer:
+                return
+            data = ''.join(self.buffer)
+            self.buffer.clear()
+            if self.should_rollover(len(data)):
+                self.rollover()
+            self.stream.write(data)
+            self.stream.flush()
+        finally:
+            self.release()
+
+    def flush_periodically(self, flush_interval: float):
+        while not self.closed.wait(flush_interval):
+            self.flush()
+
+    def should_rollover(self, size: int) -> bool:
+        if self.max_bytes and self.stream.tell() and self.stream.tell() + size > self.max_bytes:
+            return True
+        return self.rollover_at is not None and datetime.datetime.now().timestamp() >= self.rollover_at
+
+    def backup_name(self, number: int) -> str:
+        return f"{self.filename}.{number}" + ('.gz' if self.compress else '')
+
+    def rollover(self):
+        import gzip
+
+        self.stream.close()
+        # file.1 is the newest backup, the oldest one is dropped
+        for number in range(self.backups - 1, 0, -1):
+            if os.path.exists(self.backup_name(number)):
+                os.replace(self.backup_name(number), self.backup_name(number + 1))
+        if not self.backups:
+            os.remove(self.filename)
+        elif self.compress:
+            with open(self.filename, 'rb') as source, gzip.open(self.backup_name(1), 'wb') as target:
+                shutil.copyfileobj(source, target)
+            os.remove(self.filename)
+        else:
+            os.replace(self.filename, self.backup_name(1))
+        self.open()
+
+    def close(self):
+        self.closed.set()
+        self.flush()
+        self.acquire()
+        try:
+            self.stream.close()
+        finally:
+            self.release()
+        super().close()
+
+
+def setup_logging(args: argparse.Namespace) -> logging.Handler:
+    # Replaces the file handler of the module logger by a queue, written by a listener thread
+    from logging.handlers import QueueHandler, QueueListener
+
+    log_format = getattr(args, 'log_format', 'json')
+    os.makedirs(os.path.expanduser(args.log), exist_ok=True)
+    file_handler = BatchedFileHandler(
+        os.path.join(os.path.expanduser(args.log), LOG_FILES[log_format]),
+        getattr(args, 'log_max_bytes', 0),
+        getattr(args, 'log_backups', 10),
+        getattr(args, 'log_rotate_hours', 0) * 3600,
+        getattr(args, 'log_compress', False)
+    )
+    file_handler.setFormatter(JsonFormatter() if log_format == 'json' else formatter)
+    listener = QueueListener(queue.SimpleQueue(), file_handler, respect_handler_level=True)
+    queue_handler = QueueHandler(listener.queue)
+    logger.addHandler(queue_handler)
+    listener.start()
+
+    def stop():
+        listener.stop()
+        file_handler.close()
+        logger.removeHandler(queue_handler)
+
+    atexit.register(stop)
+    return file_handler
+
+
+class Metrics:
+    # Per-verb histograms of the duration of each phase of the actions, and counters of actions,
+    # failures and typed bytes. The current action is tracked with a context variable, so phases
+    # timed from threads or tasks are attributed to the action that started them.
+    BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+    PREFIX = 'gedit_simulation'
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = {}  # (verb, phase) -> [count per bucket..., count over the last bucket, sum]
+        self.counters = {}  # (name, verb) -> value
+        self.current = contextvars.ContextVar('metrics_action', default=None)
+        self.last_id = 0
+
+    def observe(self, verb: str, phase: str, duration: float):
+        with self.lock:
+            histogram = self.histograms.setdefault((verb, phase), [0] * (len(self.BUCKETS) + 1) + [0.0])
+            histogram[bisect.bisect_left(self.BUCKETS, duration)] += 1
+            histogram[-1] += duration
+
+    def increment(self, name: str, verb: str, value: float = 1):
+        with self.lock:
+            self.counters[(name, verb)] = self.counters.get((name, verb), 0) + value
+
+    def next_id(self) -> str:
+        # Unique among the workers of a supervisor too
+        with self.lock:
+            self.last_id += 1
+            return f'{os.getpid()}-{self.last_id}'
+
+    @contextlib.contextmanager
+    def action(self, verb: str):
+        record = {'id': self.next_id(), 'verb': verb, 'phases': {}, 'outcome': 'success'}
+        token = self.current.set(record)
+        start = perf_counter()
+        try:
+            yield record
+        except BaseException as e:
+            record['error'] = str(e) or type(e).__name__
+            if isinstance(e, ActionTimeout):
+                record['outcome'] = 'timeout'
+                self.increment('timeouts_total', verb)
+            elif isinstance(e, ActionSkipped):
+                record['outcome'] = 'skipped'
+                self.increment('skipped_total', verb)
+            else:
+                record['outcome'] = 'failure'
+                self.increment('failures_total', verb)
+            raise
+        finally:
+            record['duration'] = perf_counter() - start
+            self.current.reset(token)
+            self.increment('actions_total', verb)
+            self.observe(verb, 'total', record['duration'])
+
+    @contextlib.contextmanager
+    def phase(self, name: str):
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            duration = perf_counter() - start
+            record = self.current.get()
+            if record is not None:
+                record['phases'][name] = record['phases'].get(name, 0) + duration
+                self.observe(record['verb'], name, duration)
+
+    def annotate(self, **fields):
+        # Extra information about the current action (e.g. the file), exported with it
+        record = self.current.get()
+        if record is not None:
+            record.update(fields)
+
+    def add_bytes(self, count: int):
+        record = self.current.get()
+        if record is not None:
+            self.increment('typed_bytes_total', record['verb'], count)
+
+    def write_prometheus(self, file_path: str):
+        lines = [
+            f'# HELP {self.PREFIX}_phase_seconds Duration of each phase of the actions.',
+            f'# TYPE {self.PREFIX}_phase_seconds histogram',
+        ]
+        with self.lock:
+            for (verb, phase), histogram in sorted(self.histograms.items()):
+                labels = f'verb="{verb}",phase="{phase}"'
+                cumulative = 0
+                for bucket, count in zip(self.BUCKETS, histogram):
+                    cumulative += count
+                    lines.append(f'{self.PREFIX}_phase_seconds_bucket{{{labels},le="{bucket}"}} {cumulative}')
+                total = cumulative + histogram[-2]
+                lines.append(f'{self.PREFIX}_phase_seconds_bucket{{{labels},le="+Inf"}} {total}')
+                lines.append(f'{self.PREFIX}_phase_seconds_sum{{{labels}}} {histogram[-1]}')
+                lines.append(f'{self.PREFIX}_phase_seconds_count{{{labels}}} {total}')
+            for name in sorted({name for name, _ in self.counters}):
+                lines.append(f'# TYPE {self.PREFIX}_{name} counter')
+                for (counter, verb), value in sorted(self.counters.items()):
+                    if counter == name:
+                        lines.append(f'{self.PREFIX}_{name}{{verb="{verb}"}} {value}')
+
+        # Atomic replace, as expected by the textfile collector of the node exporter
+        tmp_path = f"{file_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w') as file:
+            file.write('\n'.join(lines) + '\n')
+        os.replace(tmp_path, file_path)
+
+    def write_jsonl(self, file_path: str, record: dict):
+        with open(file_path, 'a') as file:
+            # The generated text goes to the trace (--trace), not to the metrics
+            fields = {key: value for key, value in record.items() if key != 'text'}
+            file.write(json.dumps({'time': datetime.datetime.now().isoformat(), **fields}) + '\n')
+
+
+metrics = Metrics()
+METRICS_PROMETHEUS_FILE = 'gedit-simulation.prom'
+METRICS_JSONL_FILE = 'gedit-simulation-metrics.jsonl'
+PROFILE_FILE = 'gedit-simulation.prof'
+METRICS_EXPORT_INTERVAL = 1  # Minimum time (in seconds) between two exports of the Prometheus file
+_metrics_exported_at = None
+
+
+ACTION_LOG_FIELDS = ['id', 'verb', 'file', 'strategy', 'size', 'outcome', 'error', 'duration', 'phases']
+
+
+def log_action(record: Optional[dict]):
+    # One record per action in the log, with its fields for the summary command
+    if record is None:
+        return
+    fields = {key: record[key] for key in ACTION_LOG_FIELDS if key in record}
+    logger.info(f'Action "{record["verb"]}" {record["outcome"]} in {record.get("duration", 0):.3f} seconds', extra={'action': fields})
+
+
+def export_metrics(args: argparse.Namespace, record: Optional[dict] = None, force: bool = False):
+    global _metrics_exported_at
+    if not getattr(args, 'metrics', False):
+        return
+    log_dir = os.path.expanduser(args.log)
+    try:
+        if force or _metrics_exported_at is None or monotonic() - _metrics_exported_at >= METRICS_EXPORT_INTERVAL:
+            metrics.write_prometheus(os.path.join(log_dir, METRICS_PROMETHEUS_FILE))
+            _metrics_exported_at = monotonic()
+        if record is not None:
+            metrics.write_jsonl(os.path.join(log_dir, METRICS_JSONL_FILE), record)
+    except OSError as e:
+        logger.warning(f"Could not export metrics: {e}")
+
 
 def split_path_regex(path: str) -> List[str]:
     # Regex to split path elements such as "/" or "~"
@@ -53,8 +390,19 @@ def split_path_regex(path: str) -> List[str]:
     return re.findall(pattern, path)
 
 
-def load_words() -> List[str]:
-    logger.debug("Loading words")
+# Binary cache of the dictionary, stored next to the JSON file:
+# header (magic, version, mtime, size, sha1 of the JSON, number of words, size of the text),
+# then the UTF-8 text of all the (deduplicated) words separated by NUL characters
+DICTIONARY_CACHE_SUFFIX = '.cache'
+DICTIONARY_CACHE_MAGIC = b'GSDC'
+DICTIONARY_CACHE_VERSION = 1
+DICTIONARY_CACHE_HEADER = struct.Struct('<4sHqQ20sII')
+DICTIONARY_CACHE_SEPARATOR = '\0'
+
+_words: Optional[List[str]] = None
+
+
+def find_dictionary() -> str:
     try:
         # Get the first directory in /opt/ghosts if it exists
         json_path = os.path.join(
@@ -62,24 +410,109 @@ def load_words() -> List[str]:
             os.listdir('/opt/ghosts')[0], 
             'ghosts-client/config/dictionary.json'
         )
-
-        with open(json_path, 'r', encoding='utf-8-sig') as file:
-            words = json.load(file)
-        logger.debug("Words loaded from remote dictionary")
+        if os.path.isfile(json_path):
+            logger.debug("Using remote dictionary")
+            return json_path
     except Exception: # If not, use the local dictionary (FileNotFoundError)
-        try:
-            with open('dictionary.json', 'r', encoding='utf-8-sig') as file:
-                words = json.load(file)
-            logger.debug("Words loaded from local dictionary")
-        except FileNotFoundError:
-            logger.error("No dictionary found in the current directory (where is the dictionary.json file?)")
-            exit(1)
+        pass
+
+    if not os.path.isfile('dictionary.json'):
+        logger.error("No dictionary found in the current directory (where is the dictionary.json file?)")
+        exit(1)
+    logger.debug("Using local dictionary")
+    return 'dictionary.json'
+
+
+def read_dictionary_cache(cache_path: str) -> Tuple[tuple, List[str]]:
+    with open(cache_path, 'rb') as file:
+        data = file.read()
+
+    magic, version, mtime, size, digest, count, length = DICTIONARY_CACHE_HEADER.unpack_from(data)
+    if magic != DICTIONARY_CACHE_MAGIC or version != DICTIONARY_CACHE_VERSION:
+        raise ValueError(f"Unknown dictionary cache format in {cache_path}")
+
+    text = data[DICTIONARY_CACHE_HEADER.size:]
+    if len(text) != length:
+        raise ValueError(f"Truncated dictionary cache {cache_path}")
+
+    # A single decode and split is much cheaper than parsing the JSON again
+    words = text.decode('utf-8').split(DICTIONARY_CACHE_SEPARATOR) if count else []
+    if len(words) != count:
+        raise ValueError(f"Corrupted dictionary cache {cache_path}")
+    return (mtime, size, digest), words
+
 
-    # Ensure all words are strings
-    words = [str(word) for word in words]
+def write_dictionary_cache(cache_path: str, key: tuple, words: List[str]):
+    if any(DICTIONARY_CACHE_SEPARATOR in word for word in words):
+        logger.debug("Dictionary contains NUL characters, not caching it")
+        return
+
+    text = DICTIONARY_CACHE_SEPARATOR.join(words).encode('utf-8')
+    mtime, size, digest = key
+    header = DICTIONARY_CACHE_HEADER.pack(
+        DICTIONARY_CACHE_MAGIC, DICTIONARY_CACHE_VERSION, mtime, size, digest, len(words), len(text)
+    )
+
+    # Write to a temporary file first so that concurrent readers never see a partial cache
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, 'wb') as file:
+            file.write(header)
+            file.write(text)
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        logger.debug(f"Could not write dictionary cache {cache_path}: {e}")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def load_dictionary(json_path: str, use_cache: bool = True) -> List[str]:
+    cache_path = json_path + DICTIONARY_CACHE_SUFFIX
+    stat = os.stat(json_path)
+
+    cache_key, cached_words = None, None
+    if use_cache:
+        try:
+            cache_key, cached_words = read_dictionary_cache(cache_path)
+        except (OSError, ValueError, struct.error) as e:
+            logger.debug(f"Dictionary cache not usable: {e}")
+
+    # Fast path: the JSON has not been touched since the cache was written
+    if cached_words is not None and cache_key[:2] == (stat.st_mtime_ns, stat.st_size):
+        logger.debug(f"Words loaded from dictionary cache {cache_path}")
+        return cached_words
+
+    with open(json_path, 'rb') as file:
+        data = file.read()
+    digest = hashlib.sha1(data).digest()
+    key = (stat.st_mtime_ns, stat.st_size, digest)
+
+    # Same content with a different mtime (e.g. copied file), refresh the cache key
+    if cached_words is not None and cache_key[2] == digest:
+        logger.debug(f"Words loaded from dictionary cache {cache_path} (content unchanged)")
+        write_dictionary_cache(cache_path, key, cached_words)
+        return cached_words
+
+    words = json.loads(data.decode('utf-8-sig'))
+
+    # Ensure all words are strings and remove duplicates (keeping the order)
+    words = list(dict.fromkeys(str(word) for word in words))
+    logger.debug(f"Words loaded from {json_path} ({len(words)} unique words)")
+
+    if use_cache:
+        write_dictionary_cache(cache_path, key, words)
     return words
 
 
+def load_words() -> List[str]:
+    # The dictionary is only loaded once per process
+    global _words
+    if _words is None:
+        logger.debug("Loading words")
+        _words = load_dictionary(find_dictionary())
+    return _words
+
+
 def generate_paragraph(
         words: List[str],
         min_sentences: int,
@@ -114,16 +547,510 @@ def generate_text(
     return '\n\n'.join(paragraphs)  # Join paragraphs with two newlines
 
 
+def create_rng(seed: Optional[int], use_numpy: Optional[bool], usage: str) -> Tuple[Optional[object], object]:
+    # NumPy (if available, or required with use_numpy=True) and a generator seeded with seed:
+    # a NumPy Generator, or a random.Random without NumPy
+    if use_numpy is not False:
+        try:
+            import numpy
+            return numpy, numpy.random.default_rng(seed)
+        except ImportError:
+            if use_numpy:
+                raise
+            logger.debug(f"NumPy not available, using the random module for {usage}")
+    return None, random.Random(seed)
+
+
+class BulkTextGenerator:
+    # Generates many texts at once with the same distribution as generate_text():
+    # all the counts and word indices are drawn in bulk (with NumPy if available)
+    # and each text is assembled with a single join
+    def __init__(
+            self,
+            words: List[str],
+            min_paragraphs: int,
+            max_paragraphs: int,
+            min_sentences: int,
+            max_sentences: int,
+            min_words: int,
+            max_words: int,
+            seed: Optional[int] = None,
+            use_numpy: Optional[bool] = None
+        ):
+        if min(min_paragraphs, min_sentences, min_words) < 1:
+            raise ValueError("The minimum number of paragraphs, sentences and words must be at least 1")
+        if min_paragraphs > max_paragraphs or min_sentences > max_sentences or min_words > max_words:
+            raise ValueError("The minimum number of paragraphs, sentences and words cannot exceed the maximum")
+
+        # ' '.join(words).capitalize() only keeps the first letter of the sentence uppercase
+        self.lower = [word.lower() for word in words]
+
+        # Lookup table from 16-bit random values to words, the values past the last
+        # multiple of the number of words are rejected to keep the choice uniform
+        self.table = None
+        if len(self.lower) <= 1 << 16:
+            usable = (1 << 16) // len(self.lower) * len(self.lower)
+            self.table = (self.lower * ((1 << 16) // len(self.lower)) + [None] * ((1 << 16) - usable))
+        self.paragraphs = (min_paragraphs, max_paragraphs)
+        self.sentences = (min_sentences, max_sentences)
+        self.words = (min_words, max_words)
+
+        self.numpy, self.rng = create_rng(seed, use_numpy, 'bulk generation')
+
+    def draw(self, size: int, bounds: Tuple[int, int]) -> List[int]:
+        low, high = bounds
+        if self.numpy is not None:
+            return self.rng.integers(low, high + 1, size=size).tolist()
+        return self.rng.choices(range(low, high + 1), k=size)
+
+    def draw_tokens(self, size: int) -> List[str]:
+        if self.numpy is not None:
+            indices = self.draw(size, (0, len(self.lower) - 1))
+            return list(map(self.lower.__getitem__, indices))
+        if self.table is None:
+            return self.rng.choices(self.lower, k=size)
+
+        # Everything below runs in C: random bytes -> 16-bit values -> words (dropping rejected values)
+        tokens = []
+        while len(tokens) < size:
+            missing = size - len(tokens)
+            values = array.array('H', self.rng.randbytes(2 * (missing + missing // 64 + 16)))
+            tokens.extend(filter(partial(is_not, None), map(self.table.__getitem__, values)))
+        del tokens[size:]
+        return tokens
+
+    def generate(self, count: int) -> List[str]:
+        paragraph_counts = self.draw(count, self.paragraphs)
+        sentence_counts = self.draw(sum(paragraph_counts), self.sentences)
+        word_counts = self.draw(sum(sentence_counts), self.words)
+        tokens = self.draw_tokens(sum(word_counts))
+        separators = [' '] * len(tokens)
+
+        # Capitalize the first word of each sentence and end it with a period
+        sentence_ends = list(accumulate(word_counts))
+        start = 0
+        for end in sentence_ends:
+            tokens[start] = tokens[start].capitalize()
+            separators[end - 1] = '. '
+            start = end
+
+        # Paragraphs are separated by a blank line and texts end with the last period
+        paragraph_ends = [sentence_ends[end - 1] for end in accumulate(sentence_counts)]
+        for end in paragraph_ends:
+            separators[end - 1] = '.\n\n'
+        text_ends = [paragraph_ends[end - 1] for end in accumulate(paragraph_counts)]
+        for end in text_ends:
+            separators[end - 1] = '.'
+
+        # Interleave words and separators once, then join each text in a single pass
+        pieces = [''] * (2 * len(tokens))
+        pieces[0::2] = tokens
+        pieces[1::2] = separators
+
+        texts = []
+        start = 0
+        for end in text_ends:
+            texts.append(''.join(pieces[2 * start:2 * end]))
+            start = end
+        return texts
+
+
+# Markov chain (n-gram) text generation. The model is built from a corpus directory and saved in
+# a compact binary file that is memory-mapped, so that many processes share it through the page cache:
+# header, vocabulary (NUL-separated UTF-8, token 0 is the sentence boundary) and then, aligned to 8 bytes,
+# the sorted context keys (uint64, the previous tokens packed in base vocabulary size), the CSR offsets of
+# the successors of each context (uint64), the successor tokens (uint32) and their cumulative counts (uint32)
+MARKOV_MAGIC = b'GSMK'
+MARKOV_VERSION = 1
+MARKOV_HEADER = struct.Struct('<4sHHIQQQ')
+MARKOV_TOKEN = re.compile(r"[^\W\d_]+(?:'[^\W\d_]+)*|\d+|[.!?]+")
+MARKOV_BOUNDARY = 0
+MARKOV_MODEL_FILE = os.path.join(path, 'markov.model')
+TEXT_GENERATIONS = ['random', 'markov']
+
+
+def tokenize(text: str) -> List[str]:
+    # Lowercase words, sentence punctuation becomes a boundary ('')
+    return ['' if token[0] in '.!?' else token.lower() for token in MARKOV_TOKEN.findall(text)]
+
+
+def build_markov_model(corpus_dir: str, model_path: str, order: int = 2, extensions: Tuple[str, ...] = ('.txt', '.md')):
+    vocabulary = {'': MARKOV_BOUNDARY}
+    transitions = collections.defaultdict(collections.Counter)
+
+    corpus_dir = os.path.expanduser(corpus_dir)
+    files = 0
+    for directory, _, filenames in os.walk(corpus_dir):
+        for filename in sorted(filenames):
+            if not filename.lower().endswith(extensions):
+                continue
+            with open(os.path.join(directory, filename), 'r', encoding='utf-8', errors='replace') as file:
+                tokens = tokenize(file.read())
+            files += 1
+
+            # Every text starts after a sentence boundary
+            context = (MARKOV_BOUNDARY,) * order
+            for token in tokens + ['']:
+                token_id = vocabulary.setdefault(token, len(vocabulary))
+                if token_id == MARKOV_BOUNDARY and context[-1] == MARKOV_BOUNDARY:
+                    continue
+                transitions[context][token_id] += 1
+                if token_id == MARKOV_BOUNDARY:
+                    # All the sentences start from the same context
+                    context = (MARKOV_BOUNDARY,) * order
+                else:
+                    context = (context + (token_id,))[1:]
+
+    size = len(vocabulary)
+    if size <= 1:
+        raise ValueError(f"No words found in the corpus {corpus_dir}")
+    if size ** order >= 1 << 64:
+        raise ValueError(f"Vocabulary too large ({size} words) for an order {order} model")
+
+    # Token ids sorted alphabetically, so that the same corpus always gives the same model
+    words = sorted(vocabulary, key=lambda word: (word != '', word))
+    remap = {vocabulary[word]: token_id for token_id, word in enumerate(words)}
+
+    def key(context: tuple) -> int:
+        value = 0
+        for token_id in context:
+            value = value * size + remap[token_id]
+        return value
+
+    contexts = sorted(transitions, key=key)
+    keys = array.array('Q', (key(context) for context in contexts))
+    offsets = array.array('Q', [0])
+    successors = array.array('I')
+    cumulative = array.array('I')
+    for context in contexts:
+        total = 0
+        for token_id, count in sorted((remap[token_id], count) for token_id, count in transitions[context].items()):
+            total += count
+            successors.append(token_id)
+            cumulative.append(total)
+        offsets.append(len(successors))
+
+    vocabulary_data = '\0'.join(words).encode('utf-8')
+    header = MARKOV_HEADER.pack(MARKOV_MAGIC, MARKOV_VERSION, order, size, len(keys), len(successors), len(vocabulary_data))
+    padding = b'\0' * (-(len(header) + len(vocabulary_data)) % 8)
+
+    os.makedirs(os.path.dirname(os.path.abspath(model_path)), exist_ok=True)
+    tmp_path = f"{model_path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as file:
+        for data in [header, vocabulary_data, padding, keys, offsets, successors, cumulative]:
+            file.write(data if isinstance(data, bytes) else data.tobytes())
+    os.replace(tmp_path, model_path)
+    logger.info(f"Markov model of order {order} built from {files} files: {size} words, "
+                f"{len(keys)} contexts, {len(successors)} transitions")
+
+
+class MarkovModel:
+    # Memory-mapped model written by build_markov_model(), sampled with bisect over the cumulative counts
+    def __init__(self, model_path: str):
+        with open(model_path, 'rb') as file:
+            self.mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.order, self.size, contexts, transitions, vocabulary_size = MARKOV_HEADER.unpack_from(self.mmap)
+        if magic != MARKOV_MAGIC or version != MARKOV_VERSION:
+            raise ValueError(f"Unknown Markov model format in {model_path}")
+
+        start = MARKOV_HEADER.size
+        self.words = self.mmap[start:start + vocabulary_size].decode('utf-8').split('\0')
+        start += vocabulary_size + (-(MARKOV_HEADER.size + vocabulary_size) % 8)
+
+        view = memoryview(self.mmap)
+        self.keys = view[start:start + 8 * contexts].cast('Q')
+        start += 8 * contexts
+        self.offsets = view[start:start + 8 * (contexts + 1)].cast('Q')
+        start += 8 * (contexts + 1)
+        self.successors = view[start:start + 4 * transitions].cast('I')
+        start += 4 * transitions
+        self.cumulative = view[start:start + 4 * transitions].cast('I')
+        self.modulus = self.size ** self.order
+
+    def next_token(self, key: int, rng: random.Random) -> int:
+        # The boundary is never chosen if the context has other successors, the length
+        # of the sentences is given by the parameters and not by the chain
+        context = bisect.bisect_left(self.keys, key)
+        if context == len(self.keys) or self.keys[context] != key:
+            return MARKOV_BOUNDARY
+        low, high = self.offsets[context], self.offsets[context + 1]
+        start = 0
+        if self.successors[low] == MARKOV_BOUNDARY:
+            if high - low == 1:
+                return MARKOV_BOUNDARY
+            start = self.cumulative[low]
+        value = rng.randrange(start, self.cumulative[high - 1])
+        return self.successors[bisect.bisect_right(self.cumulative, value, low, high)]
+
+    def generate_sentence(self, num_words: int, rng: random.Random) -> str:
+        sentence = []
+        key = MARKOV_BOUNDARY  # Context made only of boundaries
+        boundaries = 0
+        while len(sentence) < num_words:
+            token = self.next_token(key, rng)
+            if token == MARKOV_BOUNDARY:
+                # Dead end of the chain, start again from a boundary
+                boundaries += 1
+                if boundaries > 100 * (num_words + 1):
+                    raise ValueError("The Markov model cannot generate sentences")
+                key = MARKOV_BOUNDARY
+                continue
+            sentence.append(self.words[token])
+            key = (key * self.size + token) % self.modulus
+        return ' '.join(sentence).capitalize() + '.'
+
+    def generate_text(
+            self,
+            min_paragraphs: int,
+            max_paragraphs: int,
+            min_sentences: int,
+            max_sentences: int,
+            min_words: int,
+            max_words: int,
+            rng: random.Random = random
+        ) -> str:
+        # Same structure (and parameters) as generate_text()
+        paragraphs = []
+        for _ in range(rng.randint(min_paragraphs, max_paragraphs)):
+            sentences = [
+                self.generate_sentence(rng.randint(min_words, max_words), rng)
+                for _ in range(rng.randint(min_sentences, max_sentences))
+            ]
+            paragraphs.append(' '.join(sentences))
+        return '\n\n'.join(paragraphs)
+
+
+# Markov models by path, loaded once per process
+_markov_models = {}
+
+
+def load_markov_model(model_path: str) -> MarkovModel:
+    model_path = os.path.abspath(os.path.expanduser(model_path))
+    if model_path not in _markov_models:
+        if not os.path.isfile(model_path):
+            logger.error(f"No Markov model found in {model_path} (build it with the train command)")
+            exit(1)
+        _markov_models[model_path] = MarkovModel(model_path)
+    return _markov_models[model_path]
+
+
+def generate_text_of_length(words: List[str], length: int) -> str:
+    # Random sentences of 10 words until the text has (exactly) the given length
+    sentences = []
+    size = 0
+    while size < length:
+        sentence = ' '.join(random.choices(words, k=10)).capitalize() + '. '
+        sentences.append(sentence)
+        size += len(sentence)
+    return ''.join(sentences)[:length]
+
+
+FILENAME_CHARACTERS = string.ascii_letters + string.digits  # Mix of letters (upper and lower case) and digits
+
+
 def generate_filename(
         min_filename_length: int,
-        max_filename_length: int
+        max_filename_length: int,
+        rng: random.Random = random
     ) -> str:
-    length = random.randint(min_filename_length, max_filename_length)  # Length of the filename
-    characters = string.ascii_letters + string.digits  # Mix of letters (upper and lower case) and digits
-    filename = ''.join(random.choice(characters) for _ in range(length)) + '.txt'
+    length = rng.randint(min_filename_length, max_filename_length)  # Length of the filename
+    filename = ''.join(rng.choice(FILENAME_CHARACTERS) for _ in range(length)) + '.txt'
     return filename
 
 
+class FilenamePermutation:
+    # Distinct filenames with the same look as generate_filename(): the n-th name of each length is the
+    # n-th element of a random permutation of all the names of that length (x -> a * x + b mod 62^length,
+    # with the digits reversed in between two of them so that consecutive names share no pattern)
+    def __init__(self, min_filename_length: int, max_filename_length: int, rng: random.Random = random):
+        base = len(FILENAME_CHARACTERS)
+        units = [unit for unit in range(1, base) if math.gcd(unit, base) == 1]
+        self.permutations = {}
+        for length in range(min_filename_length, max_filename_length + 1):
+            size = base ** length
+            # a is invertible modulo base^length as long as it is coprime with base
+            steps = [(rng.randrange(size // base) * base + rng.choice(units), rng.randrange(size)) for _ in range(2)]
+            self.permutations[length] = (size, steps)
+
+    def capacity(self, length: int) -> int:
+        return self.permutations[length][0]
+
+    def name(self, length: int, index: int) -> str:
+        size, ((a1, b1), (a2, b2)) = self.permutations[length]
+        value = (a1 * index + b1) % size
+        digits = []
+        for _ in range(length):
+            value, digit = divmod(value, len(FILENAME_CHARACTERS))
+            digits.append(digit)
+        value = 0
+        for digit in digits:
+            value = value * len(FILENAME_CHARACTERS) + digit
+        value = (a2 * value + b2) % size
+        characters = []
+        for _ in range(length):
+            value, digit = divmod(value, len(FILENAME_CHARACTERS))
+            characters.append(FILENAME_CHARACTERS[digit])
+        return ''.join(characters) + '.txt'
+
+
+class ContentSpool:
+    # Documents (filename and text) generated ahead of time by a background thread, so that
+    # the actions only pop them. They are kept in an append-only file (one JSON line per document)
+    # and the offset of the next document to pop is kept in another file, so the documents that
+    # were not used survive a restart.
+    DATA_FILE = 'spool.jsonl'
+    OFFSET_FILE = 'spool.offset'
+    OFFSET = struct.Struct('<Q')
+    BATCH = 16  # Documents generated at once
+    COMPACT_SIZE = 16 * 1024 * 1024  # Rewrite the data file once this many bytes have been consumed
+    TIMEOUT = 60  # Maximum time (in seconds) an action waits for a document
+
+    def __init__(
+            self,
+            directory: str,
+            capacity: int,
+            words: List[str],
+            min_paragraphs: int,
+            max_paragraphs: int,
+            min_sentences: int,
+            max_sentences: int,
+            min_words: int,
+            max_words: int,
+            min_filename_length: int,
+            max_filename_length: int,
+            model: Optional[MarkovModel] = None
+        ):
+        self.directory = os.path.expanduser(directory)
+        os.makedirs(self.directory, exist_ok=True)
+        self.data_path = os.path.join(self.directory, self.DATA_FILE)
+        self.offset_path = os.path.join(self.directory, self.OFFSET_FILE)
+        self.capacity = capacity
+        self.filename_lengths = (min_filename_length, max_filename_length)
+
+        # Seeded from the global generator, so --seed also fixes the spooled documents
+        seed = random.getrandbits(64)
+        self.rng = random.Random(seed)
+        self.generator = BulkTextGenerator(
+            words, min_paragraphs, max_paragraphs, min_sentences, max_sentences, min_words, max_words, seed=seed
+        )
+        self.model = model
+        self.text_parameters = (min_paragraphs, max_paragraphs, min_sentences, max_sentences, min_words, max_words)
+
+        self.condition = threading.Condition()
+        self.stopped = False
+        self.error = None  # Exception that stopped the producer thread
+        self.data = open(self.data_path, 'a+b')
+        self.offset_fd = os.open(self.offset_path, os.O_RDWR | os.O_CREAT, 0o644)
+        self.load_index()
+
+        self.thread = threading.Thread(target=self.produce, name='content-spool', daemon=True)
+        self.thread.start()
+
+    def load_index(self):
+        # (offset, length) of every document not popped yet
+        data = os.pread(self.offset_fd, self.OFFSET.size, 0)
+        self.offset = self.OFFSET.unpack(data)[0] if len(data) == self.OFFSET.size else 0
+        self.index = collections.deque()
+
+        self.data.seek(0, os.SEEK_END)
+        size = self.data.tell()
+        if self.offset > size:
+            self.offset = 0
+        self.data.seek(self.offset)
+        position = self.offset
+        for line in self.data:
+            if not line.endswith(b'\n'):
+                # Partial line of an interrupted write, dropped
+                self.data.truncate(position)
+                break
+            self.index.append((position, len(line)))
+            position += len(line)
+        logger.debug(f"Content spool {self.directory} has {len(self.index)} documents")
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def produce(self):
+        try:
+            self.fill()
+        except Exception as e:
+            # Wake up the waiting actions, they fail instead of blocking forever
+            logger.error(f"Content spool stopped: {e}")
+            with self.condition:
+                self.error = e
+                self.condition.notify_all()
+
+    def fill(self):
+        while True:
+            with self.condition:
+                while not self.stopped and len(self.index) >= self.capacity:
+                    self.condition.wait()
+                if self.stopped:
+                    return
+                missing = self.capacity - len(self.index)
+
+            # Generate outside of the lock, the actions can keep popping meanwhile
+            if self.model:
+                texts = [self.model.generate_text(*self.text_parameters, self.rng) for _ in range(min(missing, self.BATCH))]
+            else:
+                texts = self.generator.generate(min(missing, self.BATCH))
+            lines = [
+                json.dumps({'filename': generate_filename(*self.filename_lengths, self.rng), 'text': text}).encode('utf-8') + b'\n'
+                for text in texts
+            ]
+
+            with self.condition:
+                self.compact()
+                self.data.seek(0, os.SEEK_END)
+                position = self.data.tell()
+                for line in lines:
+                    self.data.write(line)
+                    self.index.append((position, len(line)))
+                    position += len(line)
+                self.data.flush()
+                self.condition.notify_all()
+
+    def compact(self):
+        # Called with the lock held: drop the consumed documents from the data file
+        if self.offset < self.COMPACT_SIZE:
+            return
+        self.data.seek(self.offset)
+        remaining = self.data.read()
+        tmp_path = self.data_path + '.tmp'
+        with open(tmp_path, 'wb') as file:
+            file.write(remaining)
+        os.replace(tmp_path, self.data_path)
+        self.data.close()
+        self.data = open(self.data_path, 'a+b')
+        self.index = collections.deque((position - self.offset, length) for position, length in self.index)
+        self.offset = 0
+        os.pwrite(self.offset_fd, self.OFFSET.pack(self.offset), 0)
+        logger.debug("Content spool compacted")
+
+    def pop(self, timeout: Optional[float] = TIMEOUT) -> Tuple[str, str]:
+        with self.condition:
+            self.condition.wait_for(lambda: self.index or self.stopped or self.error, timeout)
+            if not self.index:
+                if self.error:
+                    raise ActionError(f"Content spool failed: {self.error}")
+                raise ActionError("No document available in the content spool")
+            position, length = self.index.popleft()
+            self.data.seek(position)
+            document = json.loads(self.data.read(length))
+            self.offset = position + length
+            os.pwrite(self.offset_fd, self.OFFSET.pack(self.offset), 0)
+            self.condition.notify_all()
+        return document['filename'], document['text']
+
+    def close(self):
+        with self.condition:
+            self.stopped = True
+            self.condition.notify_all()
+        self.thread.join()
+        self.data.close()
+        os.close(self.offset_fd)
+
+
 def save_file(path: str, filename: str, interval: float):
     path = os.path.join(path, filename)
 
@@ -148,13 +1075,7 @@ def save_file(path: str, filename: str, interval: float):
 
 
 
-def random_execution(args: argparse.Namespace, subparsers: argparse._SubParsersAction) -> argparse.Namespace:
-    # Check if should execute the command
-    if random.random() > args.execution / 100:
-        logger.info("Due to the probabilities, the command will not be executed.")
-        print("Due to the probabilities, the command will not be executed.")
-        exit(0)
-
+def choose_verb(args: argparse.Namespace) -> str:
     # Check if the probabilities sum to 100
     if args.create + args.edit + args.view + args.delete != 100:
         logger.error("The sum of the probabilities of the verbs (create, edit, view, delete) must be 100.")
@@ -169,11 +1090,16 @@ def random_execution(args: argparse.Namespace, subparsers: argparse._SubParsersA
     ]
     
     # Choose a random command based on the probabilities
-    chosen_command = random.choices(verbs, probabilities)[0]
-    
-    # Get and call the chosen command parser
+    return random.choices(verbs, probabilities)[0]
+
+
+def random_execution(args: argparse.Namespace, subparsers: argparse._SubParsersAction) -> argparse.Namespace:
+    # Whether to execute the command at all is checked by main, before setting up the logging
+    chosen_command = choose_verb(args)
+
+    # Build and call the chosen command parser
     # command_parser = parser._subparsers._parser_map[chosen_command]
-    command_parser: argparse.ArgumentParser = subparsers.choices[chosen_command]
+    command_parser: argparse.ArgumentParser = subparsers.choices.get(chosen_command) or add_command_parser(subparsers, chosen_command)
     # command_args, remaining_args = command_parser.parse_known_args(args.input, args.output)
     command_args = command_parser.parse_known_args(namespace=args)[0]
 
@@ -183,62 +1109,2168 @@ def random_execution(args: argparse.Namespace, subparsers: argparse._SubParsersA
     return command_args
 
 
-def delete_process(input_dir: str):
-    input_dir = os.path.expanduser(input_dir)
-    if input_dir.lower().endswith('.txt') or input_dir.lower().endswith('.md'):
-        logger.debug(f"Input directory is a file, using it as a filename")
-        file_to_delete = input_dir
+def parse_working_hours(working_hours: str) -> Tuple[float, float]:
+    # Format "START-END" in hours of the day, e.g. "9-17" or "8.5-18"
+    try:
+        start, end = (float(hour) for hour in working_hours.split('-'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'Invalid working hours "{working_hours}" (expected START-END, e.g. 9-17)')
+    if not 0 <= start < end <= 24:
+        raise argparse.ArgumentTypeError(f'Invalid working hours "{working_hours}" (expected 0 <= START < END <= 24)')
+    return start, end
+
+
+def working_hours_rate(now: datetime.datetime, rate: float, working_hours: Tuple[float, float]) -> float:
+    # Half-sine curve over the working hours (zero outside them), scaled so that
+    # the mean rate during the working hours is equal to the given rate
+    start, end = working_hours
+    hour = now.hour + now.minute / 60 + now.second / 3600
+    if not start <= hour < end:
+        return 0.0
+    return rate * math.pi / 2 * math.sin(math.pi * (hour - start) / (end - start))
+
+
+def next_arrival_delay(args: argparse.Namespace, now: Optional[datetime.datetime] = None) -> float:
+    # Delay (in seconds) until the next action, rate is given in actions per hour
+    rate = args.rate / 3600
+    if args.arrival == 'fixed':
+        return 1 / rate
+    if args.arrival == 'poisson':
+        return random.expovariate(rate)
+
+    # Working hours: non-homogeneous Poisson process sampled by thinning
+    now = now or datetime.datetime.now()
+    peak_rate = rate * math.pi / 2
+    delay = 0.0
+    while True:
+        delay += random.expovariate(peak_rate)
+        candidate = now + datetime.timedelta(seconds=delay)
+        if random.random() * peak_rate < working_hours_rate(candidate, rate, args.working_hours):
+            return delay
+
+
+def run_action(args: argparse.Namespace, words: List[str], backend: 'Backend', spool: Optional['ContentSpool'] = None):
+    # Execute an action of the daemon, a failure is logged and does not stop the daemon
+    try:
+        execute_command(args, words, backend, spool)
+    except ActionTimeout as e:
+        logger.debug(f'Action "{args.command}" cancelled: {e}')
+    except ActionSkipped as e:
+        logger.warning(f'Action "{args.command}" skipped: {e}')
+    except ActionError as e:
+        logger.error(f'Action "{args.command}" failed: {e}')
+    except Exception:
+        logger.exception(f'Action "{args.command}" failed')
+
+
+SCHEDULERS = ['sequential', 'async']
+ACTION_GRACE = 10  # Seconds given to a cancelled action to stop before it is reported as stuck
+
+
+class AsyncScheduler:
+    # Runs the actions of the daemon as asyncio tasks: the actions that need the display are run
+    # one at a time, the others (file backend, delete) concurrently up to --concurrency. The actions
+    # themselves are blocking, so each runs in a thread and is cancelled cooperatively when it
+    # overruns --deadline (see check_cancelled), after which the backend kills its gedit.
+    def __init__(self, args: argparse.Namespace, words: List[str], backend: 'Backend', spool: Optional['ContentSpool'] = None):
+        self.args = args
+        self.words = words
+        self.backend = backend
+        self.spool = spool
+        self.actions = 0
+
+    async def run(self) -> int:
+        self.stop_event = asyncio.Event()
+        self.slots = asyncio.Semaphore(self.args.concurrency)
+        self.display = asyncio.Lock()
+        tasks = set()
+
+        loop = asyncio.get_running_loop()
+        for signum in [signal.SIGTERM, signal.SIGINT]:
+            loop.add_signal_handler(signum, self.stop, signum)
+
+        while not self.stop_event.is_set():
+            delay = next_arrival_delay(self.args) * await asyncio.to_thread(self.backend.slowdown)
+            logger.debug(f"Next action in {delay:.2f} seconds")
+            try:
+                await asyncio.wait_for(self.stop_event.wait(), delay)
+                break
+            except asyncio.TimeoutError:
+                pass
+
+            if random.random() > self.args.execution / 100:
+                logger.debug("Due to the probabilities, the action will not be executed.")
+                continue
+
+            # The arrival waits for a free slot, so the actions do not pile up behind a slow one
+            if not await self.acquire_slot():
+                break
+
+            command_args = argparse.Namespace(**vars(self.args))
+            command_args.command = choose_verb(self.args)
+            logger.debug(f'Chosen command "{command_args.command}" with args: {command_args}')
+
+            task = asyncio.create_task(self.execute(command_args))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+
+            self.actions += 1
+            if self.args.max_actions and self.actions >= self.args.max_actions:
+                logger.info(f"Reached the maximum number of actions ({self.args.max_actions})")
+                break
+
+        # The actions in progress are allowed to finish (or to reach their deadline)
+        if tasks:
+            await asyncio.gather(*tasks)
+        return self.actions
+
+    def stop(self, signum: int):
+        logger.info(f"Received signal {signum}, stopping daemon")
+        self.stop_event.set()
+
+    async def acquire_slot(self) -> bool:
+        # False if the daemon is stopped while waiting
+        acquire = asyncio.ensure_future(self.slots.acquire())
+        stopped = asyncio.ensure_future(self.stop_event.wait())
+        await asyncio.wait({acquire, stopped}, return_when=asyncio.FIRST_COMPLETED)
+        stopped.cancel()
+        if not acquire.done():
+            acquire.cancel()
+            return False
+        if self.stop_event.is_set():
+            self.slots.release()
+            return False
+        return True
+
+    async def execute(self, command_args: argparse.Namespace):
+        # The slot was acquired by run
+        try:
+            if self.backend.needs_display(command_args.command):
+                async with self.display:
+                    await self.execute_with_deadline(command_args)
+            else:
+                await self.execute_with_deadline(command_args)
+        finally:
+            self.slots.release()
+
+    async def execute_with_deadline(self, command_args: argparse.Namespace):
+        # The thread inherits the context of this task, and with it the cancellation event
+        cancelled = threading.Event()
+        action_cancelled.set(cancelled)
+        action = asyncio.ensure_future(asyncio.to_thread(run_action, command_args, self.words, self.backend, self.spool))
+        done, _ = await asyncio.wait({action}, timeout=self.args.deadline or None)
+        if done:
+            return
+
+        logger.error(f'Action "{command_args.command}" timed out after {self.args.deadline} seconds')
+        cancelled.set()
+        await self.backend.abort()
+        done, _ = await asyncio.wait({action}, timeout=ACTION_GRACE)
+        if not done:
+            logger.warning(f'Action "{command_args.command}" is still running {ACTION_GRACE} seconds after its deadline')
+            # Its thread may still be sending keys: keep the display (and the slot) until it exits
+            await asyncio.wait({action})
+
+
+def daemon_execution(args: argparse.Namespace):
+    # Stop gracefully on SIGTERM/SIGINT, the current action is allowed to finish
+    stop_event = threading.Event()
+
+    def stop(signum, frame):
+        logger.info(f"Received signal {signum}, stopping daemon")
+        stop_event.set()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    # Check the probabilities once instead of on every action
+    choose_verb(args)
+    if args.concurrency < 1:
+        logger.error("--concurrency must be at least 1")
+        exit(1)
+    if args.rate <= 0:
+        logger.error("--rate must be positive")
+        exit(1)
+
+    words = load_words()
+    backend = create_backend(args)
+    spool = None
+    if args.spool:
+        spool = ContentSpool(
+            args.spool,
+            args.spool_size,
+            words,
+            args.min_paragraphs,
+            args.max_paragraphs,
+            args.min_sentences,
+            args.max_sentences,
+            args.min_words,
+            args.max_words,
+            args.min_filename_length,
+            args.max_filename_length,
+            load_markov_model(args.model) if args.text_generation == 'markov' else None
+        )
+    actions = 0
+    logger.info(f'Daemon started ({args.arrival} arrivals, {args.rate} actions per hour, {args.scheduler} scheduler)')
+
+    if args.scheduler == 'async':
+        actions = asyncio.run(AsyncScheduler(args, words, backend, spool).run())
+
+    while args.scheduler == 'sequential' and not stop_event.is_set():
+        delay = next_arrival_delay(args) * backend.slowdown()
+        logger.debug(f"Next action in {delay:.2f} seconds")
+        if stop_event.wait(delay):
+            break
+
+        if random.random() > args.execution / 100:
+            logger.debug("Due to the probabilities, the action will not be executed.")
+            continue
+
+        command_args = argparse.Namespace(**vars(args))
+        command_args.command = choose_verb(args)
+        logger.debug(f'Chosen command "{command_args.command}" with args: {command_args}')
+
+        run_action(command_args, words, backend, spool)
+
+        actions += 1
+        if args.max_actions and actions >= args.max_actions:
+            logger.info(f"Reached the maximum number of actions ({args.max_actions})")
+            break
+
+    if spool is not None:
+        spool.close()
+    shutdown_sessions()
+    export_metrics(args, force=True)
+    close_traces()
+    logger.info(f"Daemon stopped after {actions} actions")
+
+
+# Traces: one JSON line per action (verb, file, text or its hash, timings), preceded by a header line.
+# They are written with --trace and executed again, as fast as possible or with the recorded timing, by replay.
+TRACE_VERSION = 1
+TRACE_CONTENTS = ['text', 'hash']
+_traces = {}  # path -> (file, creation timestamp)
+_traces_lock = threading.Lock()
+
+
+def trace_created(trace_path: str) -> Optional[float]:
+    # Timestamp of the creation of a trace, from its header
+    with open(trace_path, 'r', encoding='utf-8') as file:
+        try:
+            header = json.loads(file.readline())
+            return datetime.datetime.fromisoformat(header['created']).timestamp()
+        except (ValueError, KeyError, TypeError):
+            return None
+
+
+def open_trace(trace_path: str, seed: Optional[int] = None, start: Optional[float] = None):
+    # The offsets are relative to the creation of the trace (the start of its first action), so that
+    # the runs appending to the same trace (e.g. one per cron job) keep their pace
+    trace_path = os.path.expanduser(trace_path)
+    if trace_path not in _traces:
+        file = open(trace_path, 'a', encoding='utf-8')
+        if file.tell() == 0:
+            created = datetime.datetime.fromtimestamp(start) if start is not None else datetime.datetime.now()
+            file.write(json.dumps({'trace': TRACE_VERSION, 'seed': seed, 'created': created.isoformat()}) + '\n')
+            file.flush()
+            created = created.timestamp()
+        else:
+            created = trace_created(trace_path)
+            if created is None:
+                logger.warning(f"No creation time in the header of {trace_path}, offsets are relative to now")
+                created = datetime.datetime.now().timestamp()
+        _traces[trace_path] = (file, created)
+    return _traces[trace_path]
+
+
+def trace_entry(record: dict, offset: float, content: str = 'text') -> dict:
+    entry = {'offset': round(offset, 6), 'verb': record['verb']}
+    for field in ['file', 'view_time', 'strategy', 'start', 'end', 'duration', 'outcome']:
+        if field in record:
+            entry[field] = record[field]
+    if 'text' in record:
+        if content == 'text':
+            entry['text'] = record['text']
+        else:
+            entry['text_sha1'] = hashlib.sha1(record['text'].encode('utf-8')).hexdigest()
+            entry['text_length'] = len(record['text'])
+    return entry
+
+
+def write_trace(args: argparse.Namespace, record: Optional[dict]):
+    if not getattr(args, 'trace', None) or record is None:
+        return
+    with _traces_lock:
+        # The offset is the start of the action since the trace was created
+        start = datetime.datetime.now().timestamp() - record.get('duration', 0)
+        file, created = open_trace(args.trace, getattr(args, 'seed', None), start)
+        # (never negative, the creation time is rounded to the microsecond in the header)
+        offset = max(start - created, 0.0)
+        file.write(json.dumps(trace_entry(record, offset, args.trace_content)) + '\n')
+        file.flush()
+
+
+def close_traces():
+    for file, _ in _traces.values():
+        file.close()
+    _traces.clear()
+
+
+def read_trace(trace_path: str):
+    with open(os.path.expanduser(trace_path), 'r', encoding='utf-8') as file:
+        for line in file:
+            if line.strip():
+                entry = json.loads(line)
+                if 'trace' not in entry:
+                    yield entry
+
+
+def rebase_path(file_path: str, rebase: Optional[List[str]]) -> str:
+    if rebase:
+        source, destination = rebase
+        if file_path == source or file_path.startswith(source.rstrip('/') + '/'):
+            return destination.rstrip('/') + file_path[len(source.rstrip('/')):]
+    return file_path
+
+
+def replay_execution(args: argparse.Namespace):
+    backend = create_backend(args)
+    words = None
+    actions, failures = 0, 0
+    start = monotonic()
+
+    for entry in read_trace(args.trace_file):
+        if 'file' not in entry:
+            continue
+        verb = entry['verb']
+        file_path = rebase_path(entry['file'], args.rebase)
+
+        # Keep the recorded pace (scaled by --speed) if asked to
+        if args.timing == 'recorded':
+            delay = entry['offset'] / args.speed - (monotonic() - start)
+            if delay > 0:
+                sleep(delay)
+
+        text = entry.get('text')
+        if text is None and verb in ['create', 'edit']:
+            # Traces with hashes only: same amount of text, different words
+            words = words or load_words()
+            text = generate_text_of_length(words, entry.get('text_length', 0))
+
+        try:
+            with metrics.action(verb) as record:
+                metrics.annotate(file=file_path)
+                if verb == 'create':
+                    backend.create(file_path, text, args.interval_between_keystrokes)
+                elif verb == 'edit':
+                    plan = EditPlan(entry['strategy'], entry['start'], entry['end']) if 'strategy' in entry else None
+                    backend.edit(file_path, text, args.interval_between_keystrokes, plan)
+                elif verb == 'view':
+                    backend.view(file_path, entry.get('view_time', 0))
+                elif verb == 'delete':
+                    backend.delete(file_path)
+        except (ActionError, OSError) as e:
+            failures += 1
+            logger.error(f'Replayed action "{verb}" on {file_path} failed: {e}')
+        actions += 1
+        export_metrics(args, record)
+        log_action(record)
+
+    elapsed = monotonic() - start
+    export_metrics(args, force=True)
+    shutdown_sessions()
+    logger.info(f"Replayed {actions} actions ({failures} failed) in {elapsed:.3f} seconds "
+                f"({actions / elapsed if elapsed else 0:.1f} actions per second)")
+
+
+def plan_execution(args: argparse.Namespace):
+    # Generate a whole plan of actions (without executing them) as a trace, simulating the
+    # files that the plan creates and deletes to choose the targets of the next actions
+    choose_verb(args)
+    if args.rate <= 0:
+        logger.error("--rate must be positive")
+        exit(1)
+    words = load_words()
+    model = load_markov_model(args.model) if args.text_generation == 'markov' else None
+    input_dir = os.path.expanduser(args.input)
+    output_dir = os.path.expanduser(args.output)
+
+    files = sorted(
+        entry.path for entry in os.scandir(input_dir)
+        if entry.is_file() and entry.name.lower().endswith(args.extensions)
+    ) if os.path.isdir(input_dir) else []
+    slots = {file: slot for slot, file in enumerate(files)}
+
+    def remove(file: str):
+        slot = slots.pop(file)
+        last = files.pop()
+        if last != file:
+            files[slot] = last
+            slots[last] = slot
+
+    def make_text() -> str:
+        parameters = (args.min_paragraphs, args.max_paragraphs, args.min_sentences, args.max_sentences, args.min_words, args.max_words)
+        return model.generate_text(*parameters) if model else generate_text(words, *parameters)
+
+    offset = 0.0
+    with open(os.path.expanduser(args.trace_file), 'w', encoding='utf-8') as trace:
+        trace.write(json.dumps({'trace': TRACE_VERSION, 'seed': args.seed, 'created': datetime.datetime.now().isoformat()}) + '\n')
+        for _ in range(args.actions):
+            offset += next_arrival_delay(args)
+            verb = choose_verb(args)
+            record = {'verb': verb}
+
+            if verb == 'create':
+                record['text'] = make_text()
+                record['file'] = os.path.join(output_dir, generate_filename(args.min_filename_length, args.max_filename_length))
+                if record['file'] not in slots and os.path.dirname(record['file']) == input_dir:
+                    slots[record['file']] = len(files)
+                    files.append(record['file'])
+            elif files:
+                record['file'] = random.choice(files)
+                if verb == 'edit':
+                    record['text'] = make_text()
+                elif verb == 'view':
+                    record['view_time'] = args.time or random.randint(args.min_time, args.max_time)
+                else:
+                    remove(record['file'])
+
+            trace.write(json.dumps(trace_entry(record, offset, args.trace_content)) + '\n')
+
+    logger.info(f"Planned {args.actions} actions in {args.trace_file}")
+
+
+SEED_BATCH = 256  # Documents generated and written by a worker at a time
+SEED_WRITE_BUFFER = 1024 * 1024
+
+
+def seed_filenames(count: int, min_filename_length: int, max_filename_length: int, existing: set, rng: random.Random = random) -> List[str]:
+    # Distinct names, none of them already in the directory (skipped, not drawn again)
+    permutation = FilenamePermutation(min_filename_length, max_filename_length, rng)
+    lengths = list(range(min_filename_length, max_filename_length + 1))
+    used = dict.fromkeys(lengths, 0)
+    names = []
+    while len(names) < count:
+        length = rng.randint(min_filename_length, max_filename_length)
+        if used[length] >= permutation.capacity(length):
+            available = [length for length in lengths if used[length] < permutation.capacity(length)]
+            if not available:
+                break
+            length = rng.choice(available)
+        name = permutation.name(length, used[length])
+        used[length] += 1
+        if name not in existing:
+            names.append(name)
+    return names
+
+
+def backdate_times(count: int, days: float, working_hours: Tuple[float, float] = (9, 17), rng: random.Random = random) -> List[Tuple[float, float]]:
+    # (atime, mtime) of documents written over the last days: mostly on weekdays, during the working
+    # hours with the same half-sine profile as the working-hours arrivals, and read again some time later
+    now = datetime.datetime.now()
+    start, end = working_hours
+    times = []
+    for _ in range(count):
+        day = now - datetime.timedelta(days=rng.uniform(0, days))
+        while day.weekday() >= 5 and rng.random() < 0.8:
+            day = now - datetime.timedelta(days=rng.uniform(0, days))
+        # Inverse of the CDF of the half-sine over the working hours
+        hour = start + (end - start) * math.acos(1 - 2 * rng.random()) / math.pi
+        mtime = day.replace(hour=0, minute=0, second=0, microsecond=0).timestamp() + hour * 3600
+        mtime = min(mtime, now.timestamp())
+        atime = min(mtime + rng.expovariate(1 / 86400), now.timestamp())
+        times.append((atime, mtime))
+    return times
+
+
+def seed_batch(task: tuple) -> Tuple[int, int]:
+    # Generate and write a batch of documents (run in the worker processes), returns (files, bytes)
+    output_dir, names, times, seed, lengths, model_path = task
+    if model_path:
+        model = load_markov_model(model_path)
+        rng = random.Random(seed)
+        texts = [model.generate_text(*lengths, rng=rng) for _ in names]
+    else:
+        texts = BulkTextGenerator(load_words(), *lengths, seed=seed).generate(len(names))
+
+    files, size = 0, 0
+    for index, (name, text) in enumerate(zip(names, texts)):
+        file_path = os.path.join(output_dir, name)
+        data = text.encode('utf-8')
+        try:
+            # Exclusive creation, the files of the directory are never overwritten
+            with open(file_path, 'xb', buffering=SEED_WRITE_BUFFER) as file:
+                file.write(data)
+        except FileExistsError:
+            continue
+        if times:
+            os.utime(file_path, times[index])
+        files += 1
+        size += len(data)
+    return files, size
+
+
+def seed_execution(args: argparse.Namespace):
+    output_dir = os.path.expanduser(args.output)
+    os.makedirs(output_dir, exist_ok=True)
+    lengths = (args.min_paragraphs, args.max_paragraphs, args.min_sentences, args.max_sentences, args.min_words, args.max_words)
+    # Checked here, the workers would fail with a traceback each
+    if args.min_paragraphs > args.max_paragraphs or args.min_sentences > args.max_sentences or args.min_words > args.max_words:
+        logger.error("The minimum number of paragraphs, sentences and words cannot exceed the maximum")
+        exit(1)
+    if args.text_generation != 'markov' and min(args.min_paragraphs, args.min_sentences, args.min_words) < 1:
+        logger.error("The minimum number of paragraphs, sentences and words must be at least 1")
+        exit(1)
+    model_path = None
+    if args.text_generation == 'markov':
+        model_path = os.path.expanduser(args.model)
+        load_markov_model(model_path)
     else:
-        # Choose a .txt random file to delete
-        # TODO: add more types or use an argument to determine what to delete
-        files = [f for f in os.listdir(input_dir) if f.endswith('.txt')]
-        if not files:
-            logger.debug(f"No files found in {input_dir}")
+        # Loaded (and cached) before forking, so the workers get the words for free
+        load_words()
+
+    names = seed_filenames(args.count, args.min_filename_length, args.max_filename_length, set(os.listdir(output_dir)))
+    if len(names) < args.count:
+        logger.error(f"There are only {len(names)} free filenames of {args.min_filename_length} to {args.max_filename_length} characters")
+        exit(1)
+    times = backdate_times(args.count, args.backdate, args.working_hours or (9, 17)) if args.backdate else None
+
+    tasks = [
+        (output_dir, names[start:start + SEED_BATCH], times[start:start + SEED_BATCH] if times else None,
+         random.getrandbits(64), lengths, model_path)
+        for start in range(0, args.count, SEED_BATCH)
+    ]
+    logger.info(f"Seeding {output_dir} with {args.count} documents ({args.workers or os.cpu_count()} workers)")
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    files, size = 0, 0
+    start = perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers or None) as executor:
+        for batch_files, batch_size in executor.map(seed_batch, tasks):
+            files += batch_files
+            size += batch_size
+    elapsed = perf_counter() - start
+
+    report = (f"Created {files} files ({size / 1e6:.1f} MB) in {elapsed:.2f} seconds: "
+              f"{files / elapsed:.0f} files/s, {size / 1e6 / elapsed:.1f} MB/s")
+    logger.info(report)
+    print(report)
+
+
+SUMMARY_PRECISION = 1.05  # Relative width of the latency buckets of the summary
+# Parts of the error messages that change from one action to the next (paths, file names,
+# quoted titles, numbers), replaced so that the summary groups the errors of the same kind
+ERROR_VARIABLES = re.compile(
+    r'(?P<path>(?:~|\.{1,2})?/[^\s\'"]*)'
+    r'|(?P<text>"[^"]*"|\'[^\']*\')'
+    r'|(?P<file>\b[\w.-]*\w\.[A-Za-z]\w*\b)'
+    r'|(?P<number>\b(?:0x[0-9a-fA-F]+|\d+(?:\.\d+)?)\b)'
+)
+
+
+def normalize_error(error: str) -> str:
+    return ERROR_VARIABLES.sub(lambda match: f'<{match.lastgroup}>', error)
+
+
+class LatencySummary:
+    # Streaming summary of durations: exact count, mean and maximum, and quantiles
+    # from logarithmic buckets (within SUMMARY_PRECISION of the exact value)
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = collections.Counter()
+
+    def add(self, duration: float):
+        self.count += 1
+        self.total += duration
+        self.max = max(self.max, duration)
+        self.buckets[math.floor(math.log(max(duration, 1e-6), SUMMARY_PRECISION))] += 1
+
+    def quantile(self, q: float) -> float:
+        rank = q * self.count
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                return min(SUMMARY_PRECISION ** (bucket + 1), self.max)
+        return self.max
+
+
+def log_files(paths: List[str]) -> List[str]:
+    # JSON-lines logs (and their backups) in the given files or directories, recursively
+    files = []
+    for log_path in paths:
+        log_path = os.path.expanduser(log_path)
+        if os.path.isfile(log_path):
+            files.append(log_path)
+            continue
+        for directory, _, filenames in os.walk(log_path):
+            for filename in sorted(filenames):
+                if filename.startswith(LOG_FILES['json']):
+                    files.append(os.path.join(directory, filename))
+    return files
+
+
+def summary_execution(args: argparse.Namespace):
+    import gzip
+
+    latencies = collections.defaultdict(LatencySummary)  # verb -> durations
+    outcomes = collections.defaultdict(collections.Counter)  # verb -> outcome -> count
+    errors = collections.Counter()  # (verb, normalized error) -> count
+    lines, invalid = 0, 0
+
+    files = log_files(args.paths or [args.log])
+    for file_path in files:
+        opener = gzip.open if file_path.endswith('.gz') else open
+        with opener(file_path, 'rt', encoding='utf-8', errors='replace') as file:
+            for line in file:
+                lines += 1
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    invalid += 1
+                    continue
+                if 'verb' not in entry or 'outcome' not in entry:
+                    continue
+                verb = entry['verb']
+                outcomes[verb][entry['outcome']] += 1
+                latencies[verb].add(entry.get('duration', 0))
+                if 'error' in entry:
+                    errors[(verb, normalize_error(entry['error']))] += 1
+
+    if args.json:
+        print(json.dumps({
+            'files': len(files),
+            'verbs': {
+                verb: {
+                    'actions': latency.count,
+                    'outcomes': dict(outcomes[verb]),
+                    'mean': latency.total / latency.count,
+                    'p50': latency.quantile(0.5),
+                    'p90': latency.quantile(0.9),
+                    'p99': latency.quantile(0.99),
+                    'max': latency.max,
+                }
+                for verb, latency in sorted(latencies.items())
+            },
+            'errors': [{'verb': verb, 'error': error, 'count': number} for (verb, error), number in errors.most_common(args.top)],
+        }, indent=2))
+        return
+
+    print(f"{lines} lines in {len(files)} files" + (f" ({invalid} not JSON)" if invalid else ''))
+    print()
+    print(f"{'verb':<8} {'actions':>8} {'failures':>8} {'timeouts':>8} {'skipped':>8} {'mean':>8} {'p50':>8} {'p90':>8} {'p99':>8} {'max':>8}")
+    for verb, latency in sorted(latencies.items()):
+        print(f"{verb:<8} {latency.count:>8} {outcomes[verb]['failure']:>8} {outcomes[verb]['timeout']:>8} {outcomes[verb]['skipped']:>8} "
+              f"{latency.total / latency.count:>8.3f} {latency.quantile(0.5):>8.3f} {latency.quantile(0.9):>8.3f} "
+              f"{latency.quantile(0.99):>8.3f} {latency.max:>8.3f}")
+    if errors:
+        print()
+        print("Most common errors:")
+        for (verb, error), number in errors.most_common(args.top):
+            print(f"{number:>8} {verb:<8} {error}")
+
+
+def start_xvfb(display: int, screen: str, timeout: float = 10) -> subprocess.Popen:
+    process = subprocess.Popen(
+        ['Xvfb', f':{display}', '-screen', '0', screen, '-nolisten', 'tcp'],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
+    )
+    # The display is ready once its socket exists
+    if not poll(lambda: os.path.exists(f'/tmp/.X11-unix/X{display}') or process.poll() is not None, timeout) \
+            or process.poll() is not None:
+        process.kill()
+        raise ActionError(f"Xvfb could not start on display :{display}")
+    logger.debug(f"Xvfb started on display :{display}")
+    return process
+
+
+def stop_process(process: subprocess.Popen, timeout: float = 10):
+    if process.poll() is not None:
+        return
+    process.terminate()
+    try:
+        process.wait(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+def replace_option(arguments: List[str], option: str, replace: Callable[[str], str]) -> List[str]:
+    # Copy of the command line arguments with the value of an option ("--option VALUE" or "--option=VALUE") replaced
+    arguments = list(arguments)
+    for index, argument in enumerate(arguments):
+        if argument == option and index + 1 < len(arguments):
+            arguments[index + 1] = replace(arguments[index + 1])
+        elif argument.startswith(option + '='):
+            arguments[index] = f'{option}={replace(argument[len(option) + 1:])}'
+    return arguments
+
+
+def option_value(arguments: List[str], option: str, default: Optional[str] = None) -> Optional[str]:
+    # Last value given to an option in the command line arguments, as argparse keeps it
+    value = default
+    for index, argument in enumerate(arguments):
+        if argument == option and index + 1 < len(arguments):
+            value = arguments[index + 1]
+        elif argument.startswith(option + '='):
+            value = argument[len(option) + 1:]
+    return value
+
+
+def supervise_execution(args: argparse.Namespace, worker_args: List[str]):
+    # Runs a daemon per worker, each one with its own display, directories, log file, spool, seed and trace.
+    # The remaining arguments (probabilities, arrivals, text parameters...) are shared by all of them.
+    stop_event = threading.Event()
+
+    def stop(signum, frame):
+        logger.info(f"Received signal {signum}, stopping workers")
+        stop_event.set()
+
+    # One simulated user per display: the GUI workers would type into each other's windows
+    if args.workers > 1 and not args.xvfb and option_value(worker_args, '--backend', 'gui') != 'file':
+        logger.error("Several workers driving gedit need a display each, use --xvfb (or --backend file)")
+        exit(1)
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    # Load (and cache) the dictionary once before the workers start, so that they all read the cache
+    load_words()
+
+    script = os.path.abspath(__file__)
+    xvfbs = []
+    workers = {}
+
+    def start_worker(worker: int) -> subprocess.Popen:
+        name = f'worker-{worker}'
+        directories = [os.path.join(os.path.expanduser(base), name) for base in (args.input, args.output, args.log)]
+        for directory in directories:
+            os.makedirs(directory, exist_ok=True)
+        input_dir, output_dir, log_dir = directories
+
+        env = dict(os.environ)
+        if args.xvfb:
+            env['DISPLAY'] = f':{args.display_base + worker}'
+        command = [sys.executable, script, 'daemon', '--input', input_dir, '--output', output_dir, '--log', log_dir]
+        if args.debug:
+            command.append('--debug')
+        # Each worker has its own spool, they would overwrite the offset and compact the file of the others
+        worker_command = replace_option(worker_args, '--spool', lambda spool: os.path.join(os.path.expanduser(spool), name))
+        # and its own seed and trace, the simulated users would be clones writing to the same trace
+        worker_command = replace_option(worker_command, '--seed', lambda seed: str(int(seed) + worker))
+        worker_command = replace_option(worker_command, '--trace', lambda trace: '{0}.{2}{1}'.format(*os.path.splitext(trace), name))
+        command += worker_command
+
+        logger.info(f"Starting {name} on display {env.get('DISPLAY')}")
+        return subprocess.Popen(command, env=env)
+
+    try:
+        if args.xvfb:
+            for worker in range(args.workers):
+                xvfbs.append(start_xvfb(args.display_base + worker, args.screen))
+        for worker in range(args.workers):
+            workers[worker] = start_worker(worker)
+
+        while workers and not stop_event.wait(1):
+            for worker, process in list(workers.items()):
+                returncode = process.poll()
+                if returncode is None:
+                    continue
+                if returncode != 0 and args.restart:
+                    logger.warning(f"worker-{worker} exited with code {returncode}, restarting it")
+                    workers[worker] = start_worker(worker)
+                else:
+                    logger.info(f"worker-{worker} exited with code {returncode}")
+                    del workers[worker]
+    finally:
+        for process in workers.values():
+            stop_process(process)
+        for process in xvfbs:
+            stop_process(process)
+
+    logger.info("All workers stopped")
+
+
+def is_file_path(path: str) -> bool:
+    return path.lower().endswith('.txt') or path.lower().endswith('.md')
+
+
+class FenwickTree:
+    # Prefix sums of the weights of the files, to pick a file proportionally to its weight in O(log n)
+    def __init__(self, weights: List[float] = ()):
+        # Built in O(n): every node adds its partial sum to its parent
+        self.tree = [0.0, *weights]
+        for index in range(1, len(self.tree)):
+            parent = index + (index & -index)
+            if parent < len(self.tree):
+                self.tree[parent] += self.tree[index]
+
+    def __len__(self) -> int:
+        return len(self.tree) - 1
+
+    def prefix_sum(self, index: int) -> float:
+        # Sum of the weights of the first index elements
+        total = 0.0
+        while index > 0:
+            total += self.tree[index]
+            index -= index & -index
+        return total
+
+    def append(self, weight: float):
+        index = len(self.tree)
+        self.tree.append(weight + self.prefix_sum(index - 1) - self.prefix_sum(index - (index & -index)))
+
+    def pop(self):
+        self.tree.pop()
+
+    def add(self, position: int, delta: float):
+        index = position + 1
+        while index < len(self.tree):
+            self.tree[index] += delta
+            index += index & -index
+
+    def find(self, value: float) -> int:
+        # Position of the element where the cumulative weight exceeds value
+        position = 0
+        step = 1 << (len(self).bit_length() - 1) if len(self) else 0
+        while step:
+            if position + step <= len(self) and self.tree[position + step] <= value:
+                position += step
+                value -= self.tree[position]
+            step >>= 1
+        return min(position, len(self) - 1)
+
+
+FILE_SELECTIONS = ['uniform', 'recent', 'size']
+RECENT_HALF_LIFE = 24 * 3600  # A file modified this many seconds earlier is half as likely to be chosen
+
+
+class FilePool:
+    # Index of the files of a directory, scanned once with os.scandir and then updated in place
+    # when this tool creates, edits or deletes files. External changes are detected through the
+    # modification time of the directory (inotify is not available in the standard library).
+    def __init__(
+            self,
+            root: str,
+            extensions: Tuple[str, ...] = ('.txt',),
+            recursive: bool = False,
+            selection: str = 'uniform',
+            ordered: bool = False
+        ):
+        self.root = root
+        self.extensions = tuple(extension.lower() for extension in extensions)
+        self.recursive = recursive
+        self.selection = selection
+        self.ordered = ordered
+        self.reference_time = datetime.datetime.now().timestamp()
+        # The async scheduler picks, adds and removes files from several threads at once
+        self.lock = threading.RLock()
+        self.scan()
+
+    def weight(self, stat: os.stat_result) -> float:
+        if self.selection == 'recent':
+            return 2 ** ((stat.st_mtime - self.reference_time) / RECENT_HALF_LIFE)
+        if self.selection == 'size':
+            return float(stat.st_size + 1)
+        return 1.0
+
+    def root_signature(self) -> Optional[int]:
+        try:
+            return os.stat(self.root).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def list_files(self) -> List[str]:
+        if not self.recursive:
+            # A plain listing, directories with a matching name are dropped when picked (see pick)
+            try:
+                names = os.listdir(self.root)
+            except (FileNotFoundError, NotADirectoryError):
+                return []
+            prefix = os.path.join(self.root, '')
+            return [prefix + name for name in names if name.lower().endswith(self.extensions)]
+
+        files = []
+        directories = [self.root]
+        while directories:
+            directory = directories.pop()
+            try:
+                entries = os.scandir(directory)
+            except (FileNotFoundError, NotADirectoryError):
+                continue
+            with entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        directories.append(entry.path)
+                    elif entry.name.lower().endswith(self.extensions):
+                        files.append(entry.path)
+        return files
+
+    def scan(self):
+        self.signature = self.root_signature()
+        self.paths: List[str] = self.list_files()
+        # Sorted only when seeded, so that the same seed chooses the same files
+        if self.ordered:
+            self.paths.sort()
+        self.slots = dict(zip(self.paths, range(len(self.paths))))
+
+        # The weights are only needed (and the files only stat'ed) for weighted selections
+        if self.selection == 'uniform':
+            self.weights: List[float] = [1.0] * len(self.paths)
+        else:
+            self.weights = [self.weight(stat) if stat else 0.0 for stat in map(self.stat, self.paths)]
+        self.tree = FenwickTree(self.weights if self.selection != 'uniform' else ())
+        logger.debug(f"Indexed {len(self.paths)} files in {self.root}")
+
+    @staticmethod
+    def stat(path: str) -> Optional[os.stat_result]:
+        try:
+            return os.stat(path)
+        except FileNotFoundError:
+            return None
+
+    def __len__(self) -> int:
+        return len(self.paths)
+
+    def __contains__(self, path: str) -> bool:
+        return path in self.slots
+
+    def insert(self, path: str, weight: float):
+        self.slots[path] = len(self.paths)
+        self.paths.append(path)
+        self.weights.append(weight)
+        if self.selection != 'uniform':
+            self.tree.append(weight)
+
+    def matches(self, path: str) -> bool:
+        directory = os.path.dirname(path)
+        if self.recursive:
+            inside = os.path.commonpath([self.root, directory]) == self.root
+        else:
+            inside = os.path.normpath(directory) == os.path.normpath(self.root)
+        return inside and path.lower().endswith(self.extensions)
+
+    def add(self, path: str):
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
             return
-        
-        file_to_delete = random.choice(files)
-    logger.debug(f"Deleting {file_to_delete}")
-    os.remove(os.path.join(input_dir, file_to_delete))
+        with self.lock:
+            if path in self.slots:
+                self.set_weight(path, self.weight(stat))
+            else:
+                self.insert(path, self.weight(stat))
+            self.signature = self.root_signature()
+
+    def set_weight(self, path: str, weight: float):
+        slot = self.slots[path]
+        if self.selection != 'uniform':
+            self.tree.add(slot, weight - self.weights[slot])
+        self.weights[slot] = weight
+
+    def remove(self, path: str):
+        with self.lock:
+            slot = self.slots.pop(path, None)
+            if slot is None:
+                return
+
+            # Move the last file into the freed slot so that removing is O(1) (O(log n) when weighted)
+            last = len(self.paths) - 1
+            if slot != last:
+                last_path = self.paths[last]
+                if self.selection != 'uniform':
+                    self.tree.add(slot, self.weights[last] - self.weights[slot])
+                self.paths[slot] = last_path
+                self.weights[slot] = self.weights[last]
+                self.slots[last_path] = slot
+            self.paths.pop()
+            self.weights.pop()
+            if self.selection != 'uniform':
+                self.tree.pop()
+            self.signature = self.root_signature()
+
+    def pick(self) -> Optional[str]:
+        with self.lock:
+            if self.root_signature() != self.signature:
+                logger.debug(f"{self.root} changed outside of gedit-simulation, scanning it again")
+                self.scan()
+
+            while self.paths:
+                if self.selection == 'uniform':
+                    path = random.choice(self.paths)
+                else:
+                    path = self.paths[self.tree.find(random.random() * self.tree.prefix_sum(len(self.tree)))]
+
+                # Files removed by somebody else (in subdirectories or since the last check)
+                if os.path.isfile(path):
+                    return path
+                self.remove(path)
+            return None
+
+
+class DirectoryListing:
+    # A one-shot run picks a single file, for which a plain listing is cheaper than building a pool
+    # (only for non-recursive uniform selections, the others have to visit every file anyway)
+    def __init__(self, root: str, extensions: Tuple[str, ...] = ('.txt',), ordered: bool = False):
+        self.root = root
+        extensions = tuple(extension.lower() for extension in extensions)
+        try:
+            self.names = [name for name in os.listdir(root) if name.lower().endswith(extensions)]
+        except (FileNotFoundError, NotADirectoryError):
+            self.names = []
+        if ordered:
+            self.names.sort()
+
+    def pick(self) -> Optional[str]:
+        while self.names:
+            path = os.path.join(self.root, random.choice(self.names))
+            if os.path.isfile(path):
+                return path
+            self.names.remove(os.path.basename(path))
+        return None
+
+
+# File pools by (directory, extensions, recursive, selection), kept for the whole process
+_file_pools = {}
+_file_pools_lock = threading.Lock()
+
+
+def get_file_pool(
+        input_dir: str,
+        extensions: Tuple[str, ...] = ('.txt',),
+        recursive: bool = False,
+        selection: str = 'uniform',
+        ordered: bool = False
+    ) -> FilePool:
+    key = (os.path.abspath(input_dir), tuple(extensions), recursive, selection)
+    with _file_pools_lock:
+        if key not in _file_pools:
+            _file_pools[key] = FilePool(key[0], tuple(extensions), recursive, selection, ordered)
+        return _file_pools[key]
+
+
+def file_created(path: str):
+    # Keep the file pools up to date with the changes made by this tool
+    path = os.path.abspath(path)
+    for pool in list(_file_pools.values()):
+        if pool.matches(path):
+            pool.add(path)
+
+
+def file_deleted(path: str):
+    path = os.path.abspath(path)
+    for pool in list(_file_pools.values()):
+        pool.remove(path)
+
+
+def parse_extensions(extensions: str) -> Tuple[str, ...]:
+    # Comma-separated list, e.g. ".txt,.md" (the leading dot is optional)
+    return tuple(
+        extension if extension.startswith('.') else f'.{extension}'
+        for extension in (extension.strip() for extension in extensions.split(','))
+        if extension
+    )
 
 
-def view_process(input_dir: str, min_time: int, max_time: int, fixed_time: Optional[int] = None):
+def choose_input_file(input_dir: str, pool: Optional[FilePool] = None) -> Optional[str]:
     input_dir = os.path.expanduser(input_dir)
-    if input_dir.lower().endswith('.txt') or input_dir.lower().endswith('.md'):
+    if is_file_path(input_dir):
         logger.debug(f"Input directory is a file, using it as a filename")
-        file_to_view = input_dir
+        return input_dir
+
+    logger.debug(f"Input directory is a directory, choosing a random file")
+    # An empty pool is still the configured one (FilePool defines __len__)
+    if pool is None:
+        pool = get_file_pool(input_dir)
+    file = pool.pick()
+    if file is None:
+        logger.debug(f"No files found in {input_dir}")
+    return file
+
+
+class ActionError(Exception):
+    # An action could not be completed (e.g. the window never appeared or the file was not saved)
+    pass
+
+
+class ActionTimeout(ActionError):
+    # An action overran its deadline and was cancelled by the async scheduler
+    pass
+
+
+class ActionSkipped(ActionError):
+    # An action was not started because the host is overloaded (see HealthController)
+    pass
+
+
+# Set by the async scheduler when the action running in the current thread overruns its deadline.
+# The blocking steps of the actions (polling, typing, waiting) check it between calls.
+action_cancelled = contextvars.ContextVar('action_cancelled', default=None)
+
+
+def check_cancelled():
+    event = action_cancelled.get()
+    if event is not None and event.is_set():
+        raise ActionTimeout("Deadline exceeded")
+
+
+def wait(seconds: float):
+    # pyautogui.sleep that returns as soon as the action is cancelled
+    event = action_cancelled.get()
+    if event is None:
+        pyautogui.sleep(seconds)
+    elif event.wait(seconds):
+        raise ActionTimeout("Deadline exceeded")
+
+
+# Polling of the window and of the saved files, instead of fixed waits
+POLL_INITIAL_DELAY = 0.05
+POLL_BACKOFF = 1.5
+POLL_MAX_DELAY = 0.5
+SETTLE_TIME = 0.3  # Time (in seconds) for the window to accept keystrokes once it has the focus
+
+
+def poll(condition: Callable[[], T], timeout: float) -> Optional[T]:
+    # Call condition with exponential backoff until it returns a truthy value or the timeout expires
+    deadline = monotonic() + timeout
+    delay = POLL_INITIAL_DELAY
+    while True:
+        check_cancelled()
+        result = condition()
+        if result:
+            return result
+        remaining = deadline - monotonic()
+        if remaining <= 0:
+            return None
+        sleep(min(delay, remaining))
+        delay = min(delay * POLL_BACKOFF, POLL_MAX_DELAY)
+
+
+def list_windows() -> List[Tuple[str, str, str]]:
+    # (window id, window class, title) of every window, from wmctrl or else from xdotool
+    if shutil.which('wmctrl'):
+        result = subprocess.run(['wmctrl', '-lx'], capture_output=True, text=True)
+        windows = []
+        for line in result.stdout.splitlines():
+            parts = line.split(None, 4)
+            if len(parts) >= 3:
+                windows.append((parts[0], parts[2], parts[4] if len(parts) == 5 else ''))
+        return windows
+
+    if shutil.which('xdotool'):
+        result = subprocess.run(['xdotool', 'search', '--onlyvisible', '--name', '.'], capture_output=True, text=True)
+        windows = []
+        for window_id in result.stdout.split():
+            wm_class = subprocess.run(['xdotool', 'getwindowclassname', window_id], capture_output=True, text=True).stdout.strip()
+            title = subprocess.run(['xdotool', 'getwindowname', window_id], capture_output=True, text=True).stdout.strip()
+            windows.append((window_id, wm_class, title))
+        return windows
+
+    raise ActionError("Neither wmctrl nor xdotool are available to find the windows")
+
+
+def is_window_class(wm_class: str, window_class: str) -> bool:
+    # Both "instance.Class" (wmctrl) and "Class" (xdotool) match the given window class
+    return wm_class == window_class or wm_class == window_class.split('.')[-1]
+
+
+def find_window(window_class: str, title: str = '', exclude: Collection[str] = ()) -> Optional[str]:
+    for window_id, wm_class, window_title in list_windows():
+        if is_window_class(wm_class, window_class) and title in window_title and window_id not in exclude:
+            return window_id
+    return None
+
+
+def wait_for_window(window_class: str, title: str, timeout: float) -> str:
+    window_id = poll(lambda: find_window(window_class, title), timeout)
+    if window_id is None:
+        raise ActionError(f'No {window_class} window with "{title}" appeared after {timeout} seconds')
+    logger.debug(f'Window {window_id} ready for "{title}"')
+    return window_id
+
+
+def wait_for_window_closed(window_class: str, title: str, timeout: float) -> bool:
+    closed = poll(lambda: find_window(window_class, title) is None, timeout)
+    if not closed:
+        logger.warning(f'The {window_class} window with "{title}" is still open after {timeout} seconds')
+    return bool(closed)
+
+
+def focus_window(window_id: str, settle_time: float = SETTLE_TIME):
+    if shutil.which('wmctrl'):
+        subprocess.run(['wmctrl', '-ia', window_id])
     else:
-        logger.debug(f"Input directory is a directory, choosing a random file")
-        # Choose a .txt random file to view
-        files = [f for f in os.listdir(input_dir) if f.endswith('.txt')]
-        if not files:
-            logger.debug(f"No files found in {input_dir}")
+        subprocess.run(['xdotool', 'windowactivate', '--sync', window_id])
+    pyautogui.sleep(settle_time)
+
+
+def close_window(window_id: str):
+    # Graceful close, as with the close button of the window
+    if shutil.which('wmctrl'):
+        subprocess.run(['wmctrl', '-ic', window_id])
+    else:
+        subprocess.run(['xdotool', 'windowclose', str(int(window_id, 0))])
+
+
+async def run_tool(*command: str) -> str:
+    # Output of a command run without blocking the event loop of the async scheduler
+    process = await asyncio.create_subprocess_exec(*command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    stdout, _ = await process.communicate()
+    return stdout.decode(errors='replace')
+
+
+async def window_pid(window_id: str) -> Optional[int]:
+    # Process that owns a window (wmctrl ids are hexadecimal, xdotool ids decimal)
+    if shutil.which('wmctrl'):
+        for line in (await run_tool('wmctrl', '-lp')).splitlines():
+            parts = line.split(None, 3)
+            if len(parts) >= 3 and int(parts[0], 0) == int(window_id, 0):
+                return int(parts[2]) or None
+    elif shutil.which('xdotool'):
+        output = (await run_tool('xdotool', 'getwindowpid', str(int(window_id, 0)))).strip()
+        if output.isdigit():
+            return int(output)
+    return None
+
+
+def file_signature(path: str) -> Optional[Tuple[int, int]]:
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def wait_for_file_saved(path: str, previous: Optional[Tuple[int, int]], timeout: float):
+    # The file is saved once it exists and its modification time or size changed
+    saved = poll(lambda: file_signature(path) not in (None, previous), timeout)
+    if not saved:
+        raise ActionError(f"{path} was not saved after {timeout} seconds")
+    logger.debug(f"{path} saved")
+
+
+# Typing strategies: "key" types every key with a fixed interval, "burst" types each word
+# quickly and pauses a random time between words, "paste" pastes the whole text through
+# the clipboard and "auto" picks the most realistic strategy that fits the typing budget
+TYPING_STRATEGIES = ['key', 'human', 'burst', 'paste', 'auto']
+BURST_SPEEDUP = 5  # Keys inside a word are typed this many times faster than the interval
+BURST_PAUSE = 2  # Mean pause between words (in intervals)
+PASTE_TIME = 0.5  # Approximate time (in seconds) to paste a text
+TYPING_CHUNK = 64  # Characters typed between checks for cancellation
+
+# Human typing model: the delay before every key is the interval scaled by how hard the bigram is to
+# type and by a log-normal noise, plus pauses before words and sentences, longer pauses between bursts
+# of typing and optional typos corrected with backspace. The parameters of the distributions (in
+# intervals, except noise, the sigma of the log-normal, and burst_break, the probability of a pause
+# before a word) can be overridden with --typing-profile.
+HUMAN_TYPING_PROFILE = {
+    'noise': 0.35,
+    'word_pause': 1.5,  # Mean of the exponential pause before a word
+    'sentence_pause': 6,  # Mean of the exponential pause before a sentence or a line
+    'burst_break': 0.05,
+    'burst_pause': 40,  # Mean of the exponential pause between two bursts
+    'correction_delay': 4,  # Mean of the exponential time to notice a typo
+}
+BIGRAM_FACTORS = {'alternate': 0.8, 'same_hand': 1.1, 'repeat': 1.3, 'shift': 1.6, 'other': 1.0}
+LEFT_HAND_KEYS = set('`12345qwertasdfgzxcvb')
+RIGHT_HAND_KEYS = set('67890-=yuiop[]hjkl;\'nm,./')
+SHIFTED_KEYS = set('~!@#$%^&*()_+{}|:"<>?')
+KEYBOARD_ROWS = ['1234567890', 'qwertyuiop', 'asdfghjkl', 'zxcvbnm']
+
+
+def keyboard_neighbours() -> dict:
+    # Keys next to every letter and digit on a QWERTY keyboard (same row and the rows above and below)
+    neighbours = {}
+    for row_index, row in enumerate(KEYBOARD_ROWS):
+        for column, key in enumerate(row):
+            near = []
+            for other in KEYBOARD_ROWS[max(row_index - 1, 0):row_index + 2]:
+                near.extend(other[max(column - 1, 0):column + 2])
+            neighbours[key] = ''.join(sorted(set(near) - {key}))
+    return neighbours
+
+
+KEYBOARD_NEIGHBOURS = keyboard_neighbours()
+
+
+def parse_typing_profile(profile: str) -> dict:
+    # Comma separated NAME=VALUE overrides of HUMAN_TYPING_PROFILE (e.g. "word_pause=3,noise=0.5")
+    overrides = {}
+    for item in filter(None, (item.strip() for item in profile.split(','))):
+        name, _, value = item.partition('=')
+        name = name.strip().replace('-', '_')
+        if name not in HUMAN_TYPING_PROFILE:
+            raise argparse.ArgumentTypeError(f'Unknown typing profile parameter "{name}" (expected one of {", ".join(HUMAN_TYPING_PROFILE)})')
+        try:
+            overrides[name] = float(value)
+        except ValueError:
+            raise argparse.ArgumentTypeError(f'Invalid value "{value}" for the typing profile parameter "{name}"')
+        if overrides[name] < 0:
+            raise argparse.ArgumentTypeError(f'The typing profile parameter "{name}" cannot be negative')
+    return overrides
+
+
+class KeystrokeModel:
+    # Draws the whole schedule of a text at once (with NumPy if available): the keys to press and the
+    # time at which each one is pressed. With a target rate (in words of 5 characters per minute), the
+    # delays are scaled so that the text, typos included, is typed at exactly that rate.
+    def __init__(
+            self,
+            wpm: Optional[float] = None,
+            typo_rate: float = 0.0,
+            profile: Optional[dict] = None,
+            seed: Optional[int] = None,
+            use_numpy: Optional[bool] = None
+        ):
+        if wpm is not None and wpm <= 0:
+            raise ValueError("The typing rate must be positive")
+        if not 0 <= typo_rate <= 1:
+            raise ValueError("The typo rate must be between 0 and 1")
+        self.wpm = wpm
+        self.typo_rate = typo_rate
+        self.profile = {**HUMAN_TYPING_PROFILE, **(profile or {})}
+        self.factors = {}
+
+        self.numpy, self.rng = create_rng(seed, use_numpy, 'the typing schedule')
+
+    def draw(self, size: int) -> Tuple[List[float], ...]:
+        # Log-normal noise (of mean 1), exponentials (of mean 1) and uniforms for every character
+        sigma = self.profile['noise']
+        if self.numpy is not None:
+            noise = self.rng.lognormal(-sigma * sigma / 2, sigma, size)
+            exponentials = self.rng.exponential(1.0, (3, size))
+            uniforms = self.rng.random((2, size))
+            return (noise.tolist(), *exponentials.tolist(), *uniforms.tolist())
+        rng = self.rng
+        return (
+            [rng.lognormvariate(-sigma * sigma / 2, sigma) for _ in range(size)],
+            *([rng.expovariate(1.0) for _ in range(size)] for _ in range(3)),
+            *([rng.random() for _ in range(size)] for _ in range(2)),
+        )
+
+    def bigram_factor(self, previous: str, char: str) -> float:
+        factor = self.factors.get(previous + char)
+        if factor is None:
+            lower, previous_lower = char.lower(), previous.lower()
+            if char.isupper() or char in SHIFTED_KEYS:
+                kind = 'shift'
+            elif char == previous:
+                kind = 'repeat'
+            elif lower in LEFT_HAND_KEYS and previous_lower in LEFT_HAND_KEYS or lower in RIGHT_HAND_KEYS and previous_lower in RIGHT_HAND_KEYS:
+                kind = 'same_hand'
+            elif lower in LEFT_HAND_KEYS | RIGHT_HAND_KEYS and previous_lower in LEFT_HAND_KEYS | RIGHT_HAND_KEYS:
+                kind = 'alternate'
+            else:
+                kind = 'other'
+            factor = self.factors[previous + char] = BIGRAM_FACTORS[kind]
+        return factor
+
+    def target_time(self, text: str) -> float:
+        return len(text) / 5 * 60 / self.wpm
+
+    def estimate(self, text: str, interval: float) -> float:
+        if self.wpm:
+            return self.target_time(text)
+        profile = self.profile
+        words = len(text.split())
+        sentences = len(re.findall(r'[.!?]\s|\n', text))
+        typos = len(text) * self.typo_rate * (2 + profile['correction_delay'])
+        pauses = words * (profile['word_pause'] + profile['burst_break'] * profile['burst_pause']) + sentences * profile['sentence_pause']
+        return (len(text) + typos + pauses) * interval
+
+    def schedule(self, text: str, interval: float) -> Tuple[List[str], List[float]]:
+        # Keys to press (characters or "backspace") and their offsets (in seconds) from the start
+        profile = self.profile
+        noise, pauses, breaks, corrections, burst_draws, typo_draws = self.draw(len(text))
+        keys, delays = [], []
+        previous = before_previous = ''
+        for index, char in enumerate(text):
+            delay = self.bigram_factor(previous, char) * noise[index]
+            if previous == '\n' or previous == ' ' and before_previous in '.!?':
+                delay += profile['sentence_pause'] * pauses[index]
+            elif previous == ' ' and char != ' ':
+                delay += profile['word_pause'] * pauses[index]
+                if burst_draws[index] < profile['burst_break']:
+                    delay += profile['burst_pause'] * breaks[index]
+
+            typo = typo_draws[index]
+            if typo < self.typo_rate and char.lower() in KEYBOARD_NEIGHBOURS:
+                # The wrong key is a neighbour of the right one, noticed and erased before typing it
+                neighbours = KEYBOARD_NEIGHBOURS[char.lower()]
+                wrong = neighbours[int(typo / self.typo_rate * len(neighbours))]
+                keys.extend([wrong.upper() if char.isupper() else wrong, 'backspace'])
+                delays.extend([delay, profile['correction_delay'] * corrections[index]])
+                delay = noise[index]
+            keys.append(char)
+            delays.append(delay)
+            before_previous, previous = previous, char
+
+        scale = interval
+        if self.wpm and delays:
+            scale = self.target_time(text) / sum(delays)
+        return keys, [offset * scale for offset in accumulate(delays)]
+
+
+def estimate_typing_time(text: str, interval: float, strategy: str, model: Optional[KeystrokeModel] = None) -> float:
+    if strategy == 'key':
+        return len(text) * interval
+    if strategy == 'human':
+        return (model or KeystrokeModel()).estimate(text, interval)
+    if strategy == 'burst':
+        words = len(text.split())
+        return len(text) * interval / BURST_SPEEDUP + words * interval * BURST_PAUSE
+    return PASTE_TIME
+
+
+def choose_typing_strategy(text: str, interval: float, budget: Optional[float], model: Optional[KeystrokeModel] = None) -> str:
+    # The first (most realistic) strategy that finishes within the budget
+    if budget is None:
+        return 'key'
+    for strategy in ['human', 'key', 'burst']:
+        if estimate_typing_time(text, interval, strategy, model) <= budget:
+            return strategy
+    return 'paste'
+
+
+def paste_text(text: str):
+    # Keep the clipboard of the user as it was
+    try:
+        previous = pyperclip.paste()
+    except Exception:
+        previous = None
+
+    pyperclip.copy(text)
+    pyautogui.sleep(0.05)
+    pyautogui.hotkey('ctrl', 'v')
+    pyautogui.sleep(0.2)
+
+    if previous is not None:
+        pyperclip.copy(previous)
+
+
+def type_schedule(keys: List[str], offsets: List[float]):
+    # Sleeps until the offset of every key rather than for its delay, so that the time spent sending
+    # the keys does not slow the rate down
+    start = monotonic()
+    for index, (key, offset) in enumerate(zip(keys, offsets)):
+        if index % TYPING_CHUNK == 0:
+            check_cancelled()
+        remaining = start + offset - monotonic()
+        if remaining > 0:
+            wait(remaining)
+        # Without the pause pyautogui adds after every call, as pyautogui.write() does for each key
+        pyautogui.press(key, _pause=False)
+
+
+def type_text(
+        text: str,
+        interval: float,
+        strategy: str = 'key',
+        budget: Optional[float] = None,
+        model: Optional[KeystrokeModel] = None
+    ):
+    if strategy == 'auto':
+        strategy = choose_typing_strategy(text, interval, budget, model)
+    logger.debug(f'Typing {len(text)} characters with the "{strategy}" strategy '
+                 f'(estimated {estimate_typing_time(text, interval, strategy, model):.1f} seconds)')
+
+    if strategy == 'key':
+        # In chunks, so that a cancelled action stops typing, with the pause of pyautogui only after the last one
+        for start in range(0, len(text), TYPING_CHUNK):
+            check_cancelled()
+            pyautogui.write(text[start:start + TYPING_CHUNK], interval=interval, _pause=start + TYPING_CHUNK >= len(text))
+    elif strategy == 'human':
+        type_schedule(*(model or KeystrokeModel()).schedule(text, interval))
+    elif strategy == 'burst':
+        # Words followed by their whitespace, so that newlines are typed too
+        for burst in re.findall(r'\S+\s*|\s+', text):
+            check_cancelled()
+            # Without the pause of pyautogui after each call, the pauses between words are drawn below
+            pyautogui.write(burst, interval=interval / BURST_SPEEDUP, _pause=False)
+            wait(random.expovariate(1 / (interval * BURST_PAUSE)) if interval > 0 else 0)
+    elif strategy == 'paste':
+        paste_text(text)
+    else:
+        raise ValueError(f'Unknown typing strategy "{strategy}"')
+
+
+# Edits of (possibly very big) files: the position of the edit is chosen through a memory map and a
+# sample of the line offsets, and the file backend rewrites only the bytes after it, so that the cost
+# of an edit does not depend on loading the whole file.
+EDIT_STRATEGIES = ['append', 'insert', 'modify', 'truncate', 'random']
+SIZE_POLICIES = ['rotate', 'split']
+LINE_INDEX_STRIDE = 64 * 1024  # Bytes between two sampled line offsets
+MODIFY_MAX_LINES = 5  # Maximum number of lines replaced by the "modify" strategy
+COPY_CHUNK = 1024 * 1024
+REWRITE_IN_PLACE_LIMIT = 1024 * 1024  # Tails up to this size are rewritten in place instead of copying the file
+
+# Bytes [start, end) of the file replaced by the text (start == end for appends and inserts)
+EditPlan = collections.namedtuple('EditPlan', ['strategy', 'start', 'end'])
+
+
+class LineIndex:
+    # Start offsets of a sample of the lines of a mapped file: the first line starting after every
+    # LINE_INDEX_STRIDE bytes. A random line is a random line of a random sampled segment.
+    def __init__(self, mm: mmap.mmap, size: int, stride: int = LINE_INDEX_STRIDE):
+        self.mm = mm
+        self.size = size
+        self.starts = [0]
+        position = stride
+        while position < size:
+            newline = mm.find(b'\n', position - 1)
+            if newline < 0 or newline + 1 >= size:
+                break
+            self.starts.append(newline + 1)
+            # Lines longer than the stride are sampled once
+            position = max(position + stride, (newline + 1) // stride * stride + stride)
+
+    def random_line(self, rng: random.Random = random) -> int:
+        segment = rng.randrange(len(self.starts))
+        start = self.starts[segment]
+        end = self.starts[segment + 1] if segment + 1 < len(self.starts) else self.size
+        lines = self.mm[start:end].count(b'\n')
+        if end == self.size and self.mm[end - 1:end] != b'\n':
+            lines += 1
+        for _ in range(rng.randrange(max(lines, 1))):
+            start = self.mm.find(b'\n', start) + 1
+        return start
+
+    def line_end(self, start: int, lines: int) -> int:
+        # Offset of the newline ending the given number of lines from start (or the end of the file)
+        end = start - 1
+        for _ in range(lines):
+            newline = self.mm.find(b'\n', end + 1)
+            if newline < 0:
+                return self.size
+            end = newline
+        return end
+
+
+def plan_edit(input_file: str, strategy: str = 'append', rng: random.Random = random) -> EditPlan:
+    if strategy == 'random':
+        strategy = rng.choice(EDIT_STRATEGIES[:-1])
+    size = os.path.getsize(input_file)
+    if strategy == 'append' or size == 0:
+        return EditPlan('append', size, size)
+
+    with open(input_file, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        index = LineIndex(mm, size)
+        start = index.random_line(rng)
+        if strategy == 'insert':
+            return EditPlan('insert', start, start)
+        if strategy == 'modify':
+            return EditPlan('modify', start, index.line_end(start, rng.randint(1, MODIFY_MAX_LINES)))
+        return EditPlan('truncate', start, size)
+
+
+def edit_replacement(plan: EditPlan, text: str) -> str:
+    # What ends up in the file in place of the planned range, as typed in gedit
+    if plan.strategy == 'append':
+        return '\n\n' + text
+    if plan.strategy == 'insert':
+        return text + '\n'
+    return text
+
+
+def count_lines(input_file: str, start: int, end: int) -> int:
+    # Number of newlines in [start, end), counted in chunks of the mapped file
+    if end <= start:
+        return 0
+    with open(input_file, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        return sum(mm[offset:min(offset + COPY_CHUNK, end)].count(b'\n') for offset in range(start, end, COPY_CHUNK))
+
+
+def rewrite_range(path: str, start: int, end: int, replacement: bytes):
+    # Replace the bytes [start, end) of a file. Short tails are rewritten in place, otherwise the file
+    # is copied (in chunks, through a memory map) into a new file that replaces it.
+    size = os.path.getsize(path)
+    if size - end <= REWRITE_IN_PLACE_LIMIT:
+        with open(path, 'r+b') as file:
+            file.seek(end)
+            tail = file.read()
+            file.seek(start)
+            file.write(replacement)
+            file.write(tail)
+            file.truncate()
+        return
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(path, 'rb') as source, mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ) as mm, open(tmp_path, 'wb') as target:
+        for offset in range(0, start, COPY_CHUNK):
+            target.write(mm[offset:min(offset + COPY_CHUNK, start)])
+        target.write(replacement)
+        for offset in range(end, size, COPY_CHUNK):
+            target.write(mm[offset:offset + COPY_CHUNK])
+    os.replace(tmp_path, path)
+
+
+def parse_size(size: str) -> int:
+    # Number of bytes, with an optional K, M or G suffix (e.g. "10M")
+    size = size.strip().upper().removesuffix('B')
+    multiplier = 1
+    if size and size[-1] in 'KMG':
+        multiplier = 1024 ** ('KMG'.index(size[-1]) + 1)
+        size = size[:-1]
+    return int(float(size) * multiplier)
+
+
+def limit_file_size(path: str, max_size: int, policy: str = 'rotate') -> List[str]:
+    # Keep the file under max_size bytes: "rotate" drops its oldest half, "split" moves everything but
+    # the last half into new files next to it. Cuts are made at line starts. Returns the new files.
+    size = os.path.getsize(path)
+    if not max_size or size <= max_size:
+        return []
+
+    half = max_size // 2
+    with open(path, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        cuts = []
+        position = half if policy == 'split' else size - half
+        while position < size:
+            newline = mm.find(b'\n', position - 1)
+            if newline < 0 or newline + 1 >= size:
+                break
+            cuts.append(newline + 1)
+            if policy != 'split':
+                break
+            position = newline + 1 + half
+        if not cuts:
+            return []
+
+        # The last part, where the edits are appended, stays in the original file
+        created = []
+        if policy == 'split':
+            stem, extension = os.path.splitext(path)
+            number = 1
+            for start, end in zip([0] + cuts[:-1], cuts):
+                while os.path.exists(f"{stem}.{number}{extension}"):
+                    number += 1
+                part = f"{stem}.{number}{extension}"
+                with open(part, 'wb') as target:
+                    for offset in range(start, end, COPY_CHUNK):
+                        target.write(mm[offset:min(offset + COPY_CHUNK, end)])
+                created.append(part)
+
+    if created:
+        logger.info(f"{path} is over {max_size} bytes ({size} bytes), split into {len(created) + 1} files")
+    else:
+        logger.info(f"{path} is over {max_size} bytes ({size} bytes), dropped its first {cuts[-1]} bytes")
+    rewrite_range(path, 0, cuts[-1], b'')
+    return created
+
+
+# Health of the host, sampled before the GUI actions: on a loaded host the keystroke interval, the
+# waits for the window and the delay between the actions of the daemon are multiplied by a slowdown
+# (raised at once and lowered gradually), so that the keys do not land in the wrong window. gedit
+# processes running for longer than an action can take are stuck (e.g. on a dialog) and killed, and
+# no gedit is started while --max-gedit of them are running. Only the gedit processes on the display
+# of this process are counted and killed, as every simulated user (see supervise) has its own.
+HEALTH_INTERVAL = 5  # Seconds between two samples
+LOAD_TARGET = 1.0  # Load average (over 1 minute) per CPU above which the actions are slowed down
+MEMORY_TARGET = 512 * 1024 * 1024  # Available memory (in bytes) below which the actions are slowed down
+SLOWDOWN_DECAY = 0.8  # Factor applied to the slowdown at each sample while the host is healthy
+
+HealthSample = collections.namedtuple('HealthSample', ['load', 'memory_available', 'gedit'])
+
+
+def read_load() -> float:
+    # Load average over the last minute per CPU
+    try:
+        return os.getloadavg()[0] / (os.cpu_count() or 1)
+    except (AttributeError, OSError):
+        return 0.0
+
+
+def read_memory_available() -> Optional[int]:
+    try:
+        with open('/proc/meminfo') as file:
+            for line in file:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def process_display(pid: int) -> Optional[str]:
+    # DISPLAY in the environment of a process (None if it cannot be read)
+    try:
+        with open(f'/proc/{pid}/environ', 'rb') as file:
+            environ = file.read()
+    except OSError:
+        return None
+    for variable in environ.split(b'\0'):
+        if variable.startswith(b'DISPLAY='):
+            return variable[len(b'DISPLAY='):].decode(errors='replace')
+    return ''
+
+
+def gedit_processes(display: str) -> List[Tuple[int, float]]:
+    # (pid, age in seconds) of the gedit processes of the current user on the given display, from /proc.
+    # The workers of supervise each have their own display, and only count and kill their own gedit.
+    try:
+        with open('/proc/uptime') as file:
+            uptime = float(file.read().split()[0])
+        pids = [int(entry) for entry in os.listdir('/proc') if entry.isdigit()]
+    except OSError:
+        return []
+
+    ticks = os.sysconf('SC_CLK_TCK')
+    processes = []
+    for pid in pids:
+        try:
+            if os.stat(f'/proc/{pid}').st_uid != os.getuid():
+                continue
+            with open(f'/proc/{pid}/stat') as file:
+                stat = file.read()
+        except OSError:
+            continue
+        # The name (between parentheses) may contain spaces, then come the state and, 19 fields later, the start time
+        name = stat[stat.find('(') + 1:stat.rfind(')')]
+        fields = stat[stat.rfind(')') + 2:].split()
+        if name == 'gedit' and fields[0] != 'Z' and process_display(pid) == display:
+            processes.append((pid, uptime - int(fields[19]) / ticks))
+    return processes
+
+
+class HealthController:
+    def __init__(self, max_gedit: int = 4, max_slowdown: float = 4, stuck_age: float = 900):
+        self.max_gedit = max_gedit
+        self.max_slowdown = max_slowdown
+        self.stuck_age = stuck_age
+        self.display = os.environ.get('DISPLAY', '')
+        self.slowdown = 1.0
+        self.sample: Optional[HealthSample] = None
+        self.sampled = None
+        self.lock = threading.Lock()
+
+    def update(self, force: bool = False) -> float:
+        # Sample the host (at most every HEALTH_INTERVAL seconds) and adapt the slowdown
+        with self.lock:
+            if not force and self.sampled is not None and monotonic() - self.sampled < HEALTH_INTERVAL:
+                return self.slowdown
+            self.sampled = monotonic()
+            memory_available = read_memory_available()
+            self.sample = HealthSample(read_load(), memory_available, len(gedit_processes(self.display)))
+
+            pressure = self.sample.load / LOAD_TARGET
+            if memory_available is not None:
+                pressure = max(pressure, MEMORY_TARGET / max(memory_available, 1))
+            target = min(max(pressure, 1.0), self.max_slowdown)
+            previous = self.slowdown
+            self.slowdown = target if target > previous else max(target, previous * SLOWDOWN_DECAY)
+
+            logger.debug(f"Health: load {self.sample.load:.2f} per CPU, {(memory_available or 0) // 2 ** 20} MB available, "
+                         f"{self.sample.gedit} gedit processes, slowdown {self.slowdown:.2f}")
+            if (previous == 1.0) != (self.slowdown == 1.0) or self.slowdown > previous * 1.5:
+                logger.info(f"Host {'overloaded' if self.slowdown > 1.0 else 'healthy again'}: "
+                            f"load {self.sample.load:.2f} per CPU, slowdown {self.slowdown:.2f}")
+            return self.slowdown
+
+    def clean_up(self, keep: Tuple[int, ...] = ()) -> int:
+        # Kill the gedit processes older than stuck_age (except the given ones), returns their number
+        killed = 0
+        for pid, age in gedit_processes(self.display):
+            if age > self.stuck_age and pid not in keep:
+                logger.warning(f"Killing gedit (pid {pid}) stuck for {age:.0f} seconds")
+                with contextlib.suppress(ProcessLookupError, PermissionError):
+                    os.kill(pid, signal.SIGKILL)
+                    killed += 1
+        if killed:
+            record = metrics.current.get()
+            metrics.increment('gedit_killed_total', record['verb'] if record else 'none', killed)
+        return killed
+
+    def admit(self, keep: Tuple[int, ...] = ()):
+        # Called before starting a gedit: raises ActionSkipped if too many of them are running
+        slowdown = self.update()
+        if self.clean_up(keep):
+            self.update(force=True)
+        metrics.annotate(slowdown=round(slowdown, 2), load=round(self.sample.load, 2), gedit=self.sample.gedit)
+        if self.max_gedit and self.sample.gedit >= self.max_gedit:
+            # Fresh count, the last sample may predate the end of the previous actions
+            self.update(force=True)
+            if self.sample.gedit >= self.max_gedit:
+                raise ActionSkipped(f"{self.sample.gedit} gedit processes running (--max-gedit {self.max_gedit})")
+
+
+class Backend:
+    # Performs the actions once the file and the text have been chosen,
+    # see BACKENDS for the available implementations
+    name = None
+
+    def create(self, output_file: str, text: str, interval: float):
+        raise NotImplementedError
+
+    def edit(self, input_file: str, text: str, interval: float, plan: Optional[EditPlan] = None):
+        # Without a plan, the text is appended after a blank line
+        raise NotImplementedError
+
+    def view(self, input_file: str, time: int):
+        raise NotImplementedError
+
+    def delete(self, input_file: str):
+        raise NotImplementedError
+
+    def needs_display(self, verb: str) -> bool:
+        # Actions that need the display are run one at a time by the async scheduler
+        return False
+
+    def slowdown(self) -> float:
+        # Factor applied to the delay between the actions of the daemon
+        return 1.0
+
+    async def abort(self):
+        # Clean up after an action cancelled by the async scheduler
+        pass
+
+    def recover(self):
+        # Clean up after a failed action
+        pass
+
+
+class GeditSession:
+    # A long-lived gedit instance: files are opened as new tabs in it (gedit forwards
+    # "gedit FILE" to the running instance) and closed with ctrl+w, so GTK only starts once.
+    # The empty document of the initial window keeps it open when the last file tab is closed.
+    # The session is tracked by its window: when another gedit instance is already running,
+    # "gedit --new-window" hands the window over to it and exits.
+    def __init__(self, window_class: str = 'gedit.Gedit', window_timeout: float = 10):
+        self.window_class = window_class
+        self.window_timeout = window_timeout
+        self.process: Optional[subprocess.Popen] = None
+        self.window_id: Optional[str] = None
+        self.pid: Optional[int] = None  # Of the gedit owning the window
+        self.children: List[subprocess.Popen] = []
+
+    def alive(self) -> bool:
+        return self.window_id is not None and any(window_id == self.window_id for window_id, _, _ in list_windows())
+
+    def start(self):
+        if self.alive():
             return
+        if self.window_id is not None:
+            logger.debug("gedit session window closed, restarting it")
+            self.shutdown()
+
+        logger.debug("Starting gedit session")
+        existing = {window_id for window_id, _, _ in list_windows()}
+        self.process = subprocess.Popen(['gedit', '--new-window'])
+        self.window_id = poll(lambda: find_window(self.window_class, exclude=existing), self.window_timeout)
+        if self.window_id is None:
+            raise ActionError(f"No new {self.window_class} window appeared after {self.window_timeout} seconds")
+        self.pid = asyncio.run(window_pid(self.window_id)) or self.process.pid
+        if self.process.poll() is not None:
+            # Another gedit instance (not managed by us) received the window
+            logger.debug(f"gedit session attached to an already running instance (window {self.window_id})")
+
+    def open(self, path: str):
+        self.start()
+        self.reap()
+        self.children.append(subprocess.Popen(['gedit', path]))
+
+    def reap(self):
+        # The processes that forward the files to the session exit right away
+        self.children = [process for process in self.children if process.poll() is None]
+
+    def shutdown(self):
+        if self.window_id is not None and (self.process is None or self.process.poll() is not None):
+            # The window belongs to another instance, which is left running
+            close_window(self.window_id)
+        for process in self.children + [self.process]:
+            if process is None or process.poll() is not None:
+                continue
+            process.terminate()
+            try:
+                process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+        self.process = self.window_id = self.pid = None
+        self.children = []
+        logger.debug("gedit session stopped")
+
+
+# One gedit session per display
+_sessions = {}
+
+
+def get_session(window_class: str, window_timeout: float) -> GeditSession:
+    display = os.environ.get('DISPLAY', '')
+    if display not in _sessions:
+        _sessions[display] = GeditSession(window_class, window_timeout)
+    return _sessions[display]
+
+
+def shutdown_sessions():
+    for session in _sessions.values():
+        session.shutdown()
+    _sessions.clear()
+
+
+class GuiBackend(Backend):
+    # Performs the actions driving gedit through pyautogui and wmctrl
+    name = 'gui'
+
+    def __init__(
+            self,
+            typing: str = 'key',
+            typing_budget: Optional[float] = None,
+            window_class: str = 'gedit.Gedit',
+            window_timeout: float = 10,
+            session: Optional[GeditSession] = None,
+            typing_model: Optional[KeystrokeModel] = None,
+            health: Optional[HealthController] = None
+        ):
+        self.typing = typing
+        self.typing_budget = typing_budget
+        self.typing_model = typing_model
+        self.window_class = window_class
+        self.window_timeout = window_timeout
+        self.session = session
+        self.health = health
+        # gedit process and window of the current action, killed if it is cancelled
+        self.process: Optional[subprocess.Popen] = None
+        self.window_id: Optional[str] = None
+
+    def slowdown(self) -> float:
+        return self.health.update() if self.health else 1.0
+
+    def open(self, path: str) -> str:
+        # Open gedit (or a new tab in the session) and ensure the focus is on its window
+        self.process = self.window_id = None
+        if self.health:
+            with metrics.phase('health'):
+                self.health.admit(keep=(self.session.pid,) if self.session and self.session.pid else ())
+        with metrics.phase('launch'):
+            if self.session:
+                self.session.open(path)
+            else:
+                self.process = subprocess.Popen(['gedit', path])
+            window_id = self.window_id = wait_for_window(self.window_class, os.path.basename(path), self.window_timeout * self.slowdown())
+        with metrics.phase('focus'):
+            focus_window(window_id, SETTLE_TIME * self.slowdown())
+        return window_id
+
+    def type(self, text: str, interval: float):
+        with metrics.phase('typing'):
+            type_text(text, interval * self.slowdown(), self.typing, self.typing_budget, self.typing_model)
+        metrics.add_bytes(len(text.encode('utf-8')))
+
+    def save(self, path: str, previous: Optional[Tuple[int, int]]):
+        with metrics.phase('save'):
+            pyautogui.hotkey('ctrl', 's')
+            wait_for_file_saved(path, previous, self.window_timeout * self.slowdown())
+
+    def close(self, path: str, window_id: str):
+        with metrics.phase('close'):
+            # Ensure the focus is on the gedit window again before closing it
+            focus_window(window_id, SETTLE_TIME * self.slowdown())
+            if self.session:
+                logger.debug("Closing gedit tab")
+                pyautogui.hotkey('ctrl', 'w')
+            else:
+                logger.debug("Closing gedit")
+                pyautogui.hotkey('alt', 'f4')
+            if not wait_for_window_closed(self.window_class, os.path.basename(path), self.window_timeout * self.slowdown()):
+                # Most likely held open by a dialog (e.g. unsaved changes), killed instead of piling up
+                self.recover()
+
+    def create(self, output_file: str, text: str, interval: float):
+        previous = file_signature(output_file)
+        window_id = self.open(output_file)
+
+        # Write the generated text
+        self.type(text, interval)
+
+        # Save the file
+        # save_file(output_dir, random_filename, interval)  # FIXME: Not working
+        self.save(output_file, previous)
+
+        # Close gedit
+        self.close(output_file, window_id)
+
+    def go_to_line(self, line: int):
+        # Go to line dialog of gedit, the cursor ends up at the start of the line
+        pyautogui.hotkey('ctrl', 'i')
+        pyautogui.sleep(SETTLE_TIME * self.slowdown())
+        pyautogui.write(str(line))
+        pyautogui.press('enter')
+        pyautogui.sleep(SETTLE_TIME * self.slowdown())
+
+    def edit(self, input_file: str, text: str, interval: float, plan: Optional[EditPlan] = None):
+        plan = plan or EditPlan('append', None, None)
+        previous = file_signature(input_file)
+        window_id = self.open(input_file)
+
+        if plan.strategy == 'append':
+            # Go to the end of the file
+            pyautogui.hotkey('ctrl', 'end')
+            pyautogui.write('\n\n', interval=interval * self.slowdown())
+        else:
+            with metrics.phase('position'):
+                self.go_to_line(count_lines(input_file, 0, plan.start) + 1)
+                if plan.strategy == 'modify':
+                    # Select up to the end of the last line of the range
+                    for _ in range(count_lines(input_file, plan.start, plan.end)):
+                        pyautogui.hotkey('shift', 'down')
+                    pyautogui.hotkey('shift', 'end')
+                elif plan.strategy == 'truncate':
+                    pyautogui.hotkey('ctrl', 'shift', 'end')
+
+        # Write the generated text (replacing the selection, if any)
+        self.type(text + '\n' if plan.strategy == 'insert' else text, interval)
+
+        # Save the file
+        self.save(input_file, previous)
+
+        # Close gedit
+        self.close(input_file, window_id)
+
+    def view(self, input_file: str, time: int):
+        window_id = self.open(input_file)
+
+        # Wait for the time
+        wait(time)
+
+        # Close gedit
+        self.close(input_file, window_id)
+
+    def delete(self, input_file: str):
+        os.remove(input_file)
+
+    def needs_display(self, verb: str) -> bool:
+        return verb != 'delete'
+
+    async def abort(self):
+        # Kill the gedit of the cancelled action (the whole session, restarted by the next action),
+        # and whatever owns its window, as gedit may have handed the file to another instance
+        if self.session:
+            await asyncio.to_thread(self.session.shutdown)
+        elif self.process is not None and self.process.poll() is None:
+            self.process.kill()
+        if self.window_id:
+            pid = await window_pid(self.window_id)
+            if pid:
+                logger.debug(f"Killing gedit (pid {pid})")
+                with contextlib.suppress(ProcessLookupError):
+                    os.kill(pid, signal.SIGKILL)
+            elif self.session is None:
+                # The window does not name its process, at least ask it to close
+                await asyncio.to_thread(close_window, self.window_id)
+        self.process = self.window_id = None
+
+    def recover(self):
+        if self.process is not None or self.window_id:
+            logger.warning("Killing the gedit of the action")
+            asyncio.run(self.abort())
+
+
+class FileBackend(Backend):
+    # Performs the same actions directly on disk, without a display and without waiting
+    name = 'file'
+
+    def create(self, output_file: str, text: str, interval: float):
+        with metrics.phase('write'), open(output_file, 'w', encoding='utf-8') as file:
+            file.write(text)
+        metrics.add_bytes(len(text.encode('utf-8')))
+
+    def edit(self, input_file: str, text: str, interval: float, plan: Optional[EditPlan] = None):
+        # Same result as typing the text in gedit at the planned position
+        plan = plan or EditPlan('append', None, None)
+        replacement = edit_replacement(plan, text).encode('utf-8')
+        with metrics.phase('write'):
+            if plan.strategy == 'append':
+                with open(input_file, 'ab') as file:
+                    file.write(replacement)
+            else:
+                rewrite_range(input_file, plan.start, plan.end, replacement)
+        metrics.add_bytes(len(replacement))
+
+    def view(self, input_file: str, time: int):
+        # Read the whole file (in chunks) as gedit would, without waiting
+        with metrics.phase('read'), open(input_file, 'rb') as file:
+            while file.read(1024 * 1024):
+                pass
+
+    def delete(self, input_file: str):
+        os.remove(input_file)
+
+
+BACKENDS = {
+    'gui': GuiBackend,
+    'file': FileBackend,
+}
+
+
+def create_backend(args: argparse.Namespace) -> Backend:
+    if args.backend == 'gui':
+        window_class = getattr(args, 'window_class', 'gedit.Gedit')
+        window_timeout = getattr(args, 'window_timeout', 10)
+        session = get_session(window_class, window_timeout) if getattr(args, 'reuse_session', False) else None
+
+        # view and delete do not type anything, and the model (which imports NumPy) is only built when used
+        typing = getattr(args, 'typing', 'key')
+        typing_model = None
+        if typing in ('human', 'auto'):
+            # Seeded from the global generator, so --seed also fixes the delays and the typos
+            typing_model = KeystrokeModel(
+                getattr(args, 'wpm', None),
+                getattr(args, 'typo_rate', 0.0),
+                getattr(args, 'typing_profile', None),
+                seed=random.getrandbits(64)
+            )
+        health = None
+        if getattr(args, 'health', False):
+            health = HealthController(args.max_gedit, args.max_slowdown, args.stuck_age)
+        return GuiBackend(
+            typing,
+            getattr(args, 'typing_budget', None),
+            window_class,
+            window_timeout,
+            session,
+            typing_model,
+            health
+        )
+    return BACKENDS[args.backend]()
+
+
+def delete_process(input_dir: str, backend: Optional[Backend] = None, pool: Optional[FilePool] = None):
+    backend = backend or GuiBackend()
+    file_to_delete = choose_input_file(input_dir, pool)
+    if file_to_delete is None:
+        return
 
-        file_to_view = random.choice(files)
+    logger.debug(f"Deleting {file_to_delete}")
+    metrics.annotate(file=file_to_delete)
+    backend.delete(file_to_delete)
+    file_deleted(file_to_delete)
+
+
+def view_process(
+        input_dir: str,
+        min_time: int,
+        max_time: int,
+        fixed_time: Optional[int] = None,
+        backend: Optional[Backend] = None,
+        pool: Optional[FilePool] = None
+    ):
+    backend = backend or GuiBackend()
+    file_to_view = choose_input_file(input_dir, pool)
+    if file_to_view is None:
+        return
     
     if fixed_time:
         time = fixed_time
     else:
         time = random.randint(min_time, max_time)
     logger.debug(f"Viewing {file_to_view} for {time} seconds")
+    metrics.annotate(file=file_to_view, view_time=time, size=os.path.getsize(file_to_view))
 
-    # Open gedit
-    subprocess.Popen(['gedit', os.path.join(input_dir, file_to_view)])
-
-    # Ensure the focus is on the gedit window
-    pyautogui.sleep(3)
-    os.system("wmctrl -xa gedit.Gedit")
-
-    # Wait for the time
-    pyautogui.sleep(time)
-
-    # Ensure the focus is on the gedit window again
-    os.system("wmctrl -xa gedit.Gedit")
-    pyautogui.sleep(1)
-    logger.debug("Closing gedit")
-
-    # Close gedit
-    pyautogui.hotkey('alt', 'f4')
+    backend.view(file_to_view, time)
 
 
 def edit_process(
@@ -249,51 +3281,54 @@ def edit_process(
         max_sentences: int, 
         min_words: int, 
         max_words: int,
-        interval: float
+        interval: float,
+        words: Optional[List[str]] = None,
+        backend: Optional[Backend] = None,
+        pool: Optional[FilePool] = None,
+        spool: Optional[ContentSpool] = None,
+        model: Optional[MarkovModel] = None,
+        strategy: str = 'append',
+        max_file_size: int = 0,
+        size_policy: str = 'rotate'
     ):
-    input_dir = os.path.expanduser(input_dir)
-    if input_dir.lower().endswith('.txt') or input_dir.lower().endswith('.md'):
-        logger.debug(f"Input directory is a file, using it as a filename")
-        file_to_edit = input_dir
+    backend = backend or GuiBackend()
+    file_to_edit = choose_input_file(input_dir, pool)
+    if file_to_edit is None:
+        return
+
+    # Where to write the text, without reading the whole file
+    with metrics.phase('index'):
+        plan = plan_edit(file_to_edit, strategy)
+    logger.debug(f"Editing {file_to_edit} ({plan.strategy} at byte {plan.start})")
+    metrics.annotate(file=file_to_edit, strategy=plan.strategy, start=plan.start, end=plan.end)
+
+    if spool is not None:
+        # Take a pregenerated text
+        with metrics.phase('generation'):
+            _, generated_text = spool.pop(ContentSpool.TIMEOUT)
     else:
-        logger.debug(f"Input directory is a directory, choosing a random file")
-        # Choose a .txt random file to edit
-        files = [f for f in os.listdir(input_dir) if f.endswith('.txt')]
-        if not files:
-            logger.debug(f"No files found in {input_dir}")
-            return
-        
-        file_to_edit = random.choice(files)
-    logger.debug(f"Editing {file_to_edit}")
-
-    # Load the words
-    words = load_words()
-
-    # Generate the text
-    generated_text = generate_text(words, min_paragraphs, max_paragraphs, min_sentences, max_sentences, min_words, max_words)
-
-    # Open gedit
-    subprocess.Popen(['gedit', os.path.join(input_dir, file_to_edit)])
-
-    # Ensure the focus is on the gedit window
-    pyautogui.sleep(3)
-    os.system("wmctrl -xa gedit.Gedit")
+        if model:
+            with metrics.phase('generation'):
+                generated_text = model.generate_text(min_paragraphs, max_paragraphs, min_sentences, max_sentences, min_words, max_words)
+        else:
+            # Load the words
+            with metrics.phase('dictionary'):
+                if words is None:
+                    words = load_words()
 
-    # Go to the end of the file
-    pyautogui.hotkey('ctrl', 'end')
-    pyautogui.write('\n\n', interval=interval)
+            # Generate the text
+            with metrics.phase('generation'):
+                generated_text = generate_text(words, min_paragraphs, max_paragraphs, min_sentences, max_sentences, min_words, max_words)
 
-    # Write the generated text
-    pyautogui.sleep(3)
-    pyautogui.write(generated_text, interval=interval)
-    pyautogui.sleep(1)
+    metrics.annotate(text=generated_text)
+    backend.edit(file_to_edit, generated_text, interval, plan)
+    file_created(file_to_edit)
 
-    # Save the file
-    pyautogui.hotkey('ctrl', 's')
-    pyautogui.sleep(2)
-
-    # Close gedit
-    pyautogui.hotkey('alt', 'f4')
+    # Keep the cost of the next edits bounded
+    with metrics.phase('size'):
+        for part in limit_file_size(file_to_edit, max_file_size, size_policy):
+            file_created(part)
+        metrics.annotate(size=os.path.getsize(file_to_edit))
 
 
 def create_process(
@@ -306,171 +3341,336 @@ def create_process(
         max_words: int,
         min_filename_length: int,
         max_filename_length: int,
-        interval: float
+        interval: float,
+        words: Optional[List[str]] = None,
+        backend: Optional[Backend] = None,
+        spool: Optional[ContentSpool] = None,
+        model: Optional[MarkovModel] = None
     ):
-    # Load the words
-    words = load_words()
+    backend = backend or GuiBackend()
 
-    # Generate the text
-    generated_text = generate_text(words, min_paragraphs, max_paragraphs, min_sentences, max_sentences, min_words, max_words)
+    if spool is not None:
+        # Take a pregenerated text and filename
+        with metrics.phase('generation'):
+            random_filename, generated_text = spool.pop(ContentSpool.TIMEOUT)
+    else:
+        if model:
+            with metrics.phase('generation'):
+                generated_text = model.generate_text(min_paragraphs, max_paragraphs, min_sentences, max_sentences, min_words, max_words)
+        else:
+            # Load the words
+            with metrics.phase('dictionary'):
+                if words is None:
+                    words = load_words()
+
+            # Generate the text
+            with metrics.phase('generation'):
+                generated_text = generate_text(words, min_paragraphs, max_paragraphs, min_sentences, max_sentences, min_words, max_words)
 
-    # Generate the filename
-    random_filename = generate_filename(min_filename_length, max_filename_length)
+        # Generate the filename
+        random_filename = generate_filename(min_filename_length, max_filename_length)
     logger.debug(f"Generating {random_filename}")
 
-    # Open gedit
     output_dir = os.path.expanduser(output_dir)
-    if output_dir.lower().endswith('.txt') or output_dir.lower().endswith('.md'):
+    if is_file_path(output_dir):
         logger.debug(f"Output directory is a file, using it as a filename")
         output_file = output_dir
     else:
         logger.debug(f"Output directory is a directory, appending the filename")
         output_file = os.path.join(output_dir, random_filename)
     logger.info(f"Creating in {output_file}")
-    subprocess.Popen(['gedit', output_file])
-    # subprocess.run(['gedit', output_file])
-    # os.system("gedit &")
-
-    # Ensure the focus is on the gedit window
-    pyautogui.sleep(3)
-    os.system("wmctrl -xa gedit.Gedit")
-
-    # Write the generated text
-    pyautogui.write(generated_text, interval=interval)
-    pyautogui.sleep(1)
-
-    # Save the file
-    # save_file(output_dir, random_filename, interval)  # FIXME: Not working
-    pyautogui.hotkey('ctrl', 's')
-
-    # Close gedit
-    # os.system("wmctrl -xa gedit.Gedit")
-    pyautogui.sleep(1)
-    pyautogui.hotkey('alt', 'f4')
-
-
-def main():
+    metrics.annotate(file=output_file)
+
+    metrics.annotate(text=generated_text)
+    backend.create(output_file, generated_text, interval)
+    file_created(output_file)
+
+
+# Command line: every argument is declared once in ARGUMENTS, and every command lists the arguments
+# it takes in COMMANDS (with overrides of the declaration, if any). The verb of random, daemon and plan
+# is only chosen after parsing, so they also take the arguments of all the verbs (hidden from their help).
+ARGUMENTS = {
+    # Logging
+    'log': (['--log'], dict(type=str, default=path, help='Log directory to save log files to. If it does not exist, it will be created.')),
+    'debug': (['--debug'], dict(action='store_true', help='Enable debug mode.')),
+    'log-format': (['--log-format'], dict(type=str, choices=LOG_FORMATS, default='json', help=f'Format of the log file: "json" ({LOG_FILES["json"]}, one JSON line per record, read by the summary command) or "text" ({LOG_FILES["text"]}).')),
+    'log-max-bytes': (['--log-max-bytes'], dict(type=parse_size, default=10 * 1024 * 1024, help='Size (e.g. "10M") at which the log file is rotated (0 means no limit).')),
+    'log-rotate-hours': (['--log-rotate-hours'], dict(type=float, default=0, help='Age (in hours) at which the log file is rotated (0 means no limit).')),
+    'log-backups': (['--log-backups'], dict(type=int, default=10, help='Number of rotated log files to keep.')),
+    'log-compress': (['--log-compress'], dict(action='store_true', help='Compress the rotated log files with gzip.')),
+    'metrics': (['--metrics'], dict(action='store_true', help=f'Export the duration of each phase of the actions to {METRICS_PROMETHEUS_FILE} (Prometheus text format) and {METRICS_JSONL_FILE} (one JSON line per action) in the log directory.')),
+    'profile': (['--profile'], dict(action='store_true', help=f'Profile the execution with cProfile and save the statistics to {PROFILE_FILE} in the log directory.')),
+
+    # Reproducibility
+    'seed': (['--seed'], dict(type=int, default=None, help='Seed of the random generator, to reproduce the same actions and texts.')),
+    'trace': (['--trace'], dict(type=str, default=None, help='Append every executed action (verb, file, text, timings) as a JSON line to this file, to be replayed later.')),
+    'trace-content': (['--trace-content'], dict(type=str, choices=TRACE_CONTENTS, default='text', help='Record the generated text itself or only its hash and length in the trace.')),
+    'trace_file': (['trace_file'], dict(type=str, help='Trace or plan to replay.')),
+
+    # Files
+    'input': (['--input', '-I'], dict(type=str, required=True, help='Input directory to read files from. If it is a file, it will be used as a filename.')),
+    'output': (['--output', '-O'], dict(type=str, required=True, help='Output directory to save files to. If not a directory, it will be used as a filename.')),
+    'extensions': (['--extensions'], dict(type=parse_extensions, default=('.txt',), help='Comma-separated extensions of the files to choose from (e.g. ".txt,.md").')),
+    'recursive': (['--recursive'], dict(action='store_true', help='Also choose files from the subdirectories of the input directory.')),
+    'selection': (['--selection'], dict(type=str, choices=FILE_SELECTIONS, default='uniform', help='How to choose the file: "uniform", "recent" (recently modified files are more likely) or "size" (proportional to the size).')),
+
+    # Texts and filenames
+    'min-paragraphs': (['--min-paragraphs', '-p'], dict(type=int, default=2, help='Minimum number of paragraphs to generate.')),
+    'max-paragraphs': (['--max-paragraphs', '-P'], dict(type=int, default=4, help='Maximum number of paragraphs to generate.')),
+    'min-sentences': (['--min-sentences', '-s'], dict(type=int, default=2, help='Minimum number of sentences per paragraph.')),
+    'max-sentences': (['--max-sentences', '-S'], dict(type=int, default=10, help='Maximum number of sentences per paragraph.')),
+    'min-words': (['--min-words', '-w'], dict(type=int, default=4, help='Minimum number of words per sentence.')),
+    'max-words': (['--max-words', '-W'], dict(type=int, default=15, help='Maximum number of words per sentence.')),
+    'min-filename-length': (['--min-filename-length'], dict(type=int, default=4, help='Minimum length of the generated filename.')),
+    'max-filename-length': (['--max-filename-length'], dict(type=int, default=8, help='Maximum length of the generated filename.')),
+    'text-generation': (['--text-generation'], dict(type=str, choices=TEXT_GENERATIONS, default='random', help='Text generation method: "random" (uniform words from the dictionary) or "markov" (n-gram model built with the train command).')),
+    'model': (['--model'], dict(type=str, default=MARKOV_MODEL_FILE, help='Markov model to use with --text-generation markov.')),
+
+    # Actions
+    'backend': (['--backend'], dict(type=str, choices=list(BACKENDS), default='gui', help='Backend performing the actions: "gui" drives gedit, "file" works directly on disk (no display needed).')),
+    'window-class': (['--window-class'], dict(type=str, default='gedit.Gedit', help='Window class (as shown by wmctrl -lx) of the editor window to wait for.')),
+    'health': (['--health'], dict(action='store_true', help='Sample the load, the available memory and the gedit processes before the GUI actions: slow the actions down on a loaded host, kill stuck gedit processes and skip the actions while --max-gedit of them are running.')),
+    'max-gedit': (['--max-gedit'], dict(type=int, default=4, help='Maximum number of gedit processes running at once on the display with --health (0 means no limit).')),
+    'max-slowdown': (['--max-slowdown'], dict(type=float, default=4, help='Maximum factor applied to the keystroke interval, the waits and the delay between actions with --health.')),
+    'stuck-age': (['--stuck-age'], dict(type=float, default=900, help='Age (in seconds) after which a gedit process is considered stuck and killed with --health (except the one of --reuse-session).')),
+    'window-timeout': (['--window-timeout'], dict(type=float, default=10, help='Maximum time (in seconds) to wait for the editor window to appear or close and for the file to be saved.')),
+    'interval-between-keystrokes': (['--interval-between-keystrokes'], dict(type=float, default=0.025, help='Interval (in seconds) between keystrokes when writing the generated text.')),
+    'interval-between-keystrokes-filepath': (['--interval-between-keystrokes-filepath'], dict(type=float, default=0.025, help='Interval (in seconds) between keystrokes when writing the filepath.')),
+    'typing': (['--typing'], dict(type=str, choices=TYPING_STRATEGIES, default='key', help='Typing strategy: "key" (one key every interval), "human" (delays depending on the keys, pauses between words, sentences and bursts, and typos, see --wpm, --typo-rate and --typing-profile), "burst" (fast words with random pauses between them), "paste" (through the clipboard) or "auto" (most realistic strategy that fits --typing-budget).')),
+    'wpm': (['--wpm'], dict(type=float, default=None, help='Typing rate (in words of 5 characters per minute) of the human typing strategy. By default, the delays are scaled by --interval-between-keystrokes instead.')),
+    'typo-rate': (['--typo-rate'], dict(type=float, default=0.0, help='Probability of mistyping a letter or digit (then erased with backspace) with the human typing strategy.')),
+    'typing-profile': (['--typing-profile'], dict(type=parse_typing_profile, default=None, help=f'Comma separated NAME=VALUE parameters of the human typing strategy (defaults: {",".join(f"{name}={value}" for name, value in HUMAN_TYPING_PROFILE.items())}).')),
+    'typing-budget': (['--typing-budget'], dict(type=float, default=None, help='Maximum time (in seconds) to spend typing the generated text when using --typing auto.')),
+    'min-time': (['--min-time'], dict(type=int, default=30, help='Minimum time (in seconds) to view the file.')),
+    'max-time': (['--max-time'], dict(type=int, default=30, help='Maximum time (in seconds) to view the file.')),
+    'time': (['--time', '-t'], dict(type=int, default=None, help='Fixed time (in seconds) to view the file. Overrides --min-time and --max-time.')),
+    'edit-strategy': (['--edit-strategy'], dict(type=str, choices=EDIT_STRATEGIES, default='append', help='Where to write the text: "append" (after a blank line at the end), "insert" (at a random line), "modify" (replacing a few random lines), "truncate" (replacing everything from a random line) or "random" (any of them).')),
+    'max-file-size': (['--max-file-size'], dict(type=parse_size, default=0, help='Size (e.g. "10M") over which the edited file is rotated or split (0 means no limit).')),
+    'size-policy': (['--size-policy'], dict(type=str, choices=SIZE_POLICIES, default='rotate', help='What to do with files over --max-file-size: "rotate" (drop their oldest half) or "split" (move it into new files).')),
+
+    # Random choice of the verb
+    'execution': (['--execution'], dict(type=int, default=100, help='Probability (in %%) of execution of any verb.')),
+    'create': (['--create', '-c'], dict(type=int, default=50, help='Probability (in %%) of executing "create".')),
+    'edit': (['--edit', '-e'], dict(type=int, default=20, help='Probability (in %%) of executing "edit".')),
+    'view': (['--view', '-v'], dict(type=int, default=20, help='Probability (in %%) of executing "view".')),
+    'delete': (['--delete', '-d'], dict(type=int, default=10, help='Probability (in %%) of executing "delete".')),
+    'remaining_args': (['remaining_args'], dict(nargs=argparse.REMAINDER, help='Remaining arguments for the selected command (see help for each command).')),
+    'arrival': (['--arrival'], dict(type=str, choices=['poisson', 'fixed', 'working-hours'], default='poisson', help='Distribution of the time between actions.')),
+    'rate': (['--rate'], dict(type=float, default=12, help='Mean number of actions per hour (during the working hours for "working-hours").')),
+    'working-hours': (['--working-hours'], dict(type=parse_working_hours, default=(9.0, 17.0), help='Working hours (START-END, in hours of the day) for "working-hours" arrivals.')),
+
+    # Daemon
+    'reuse-session': (['--reuse-session'], dict(action='store_true', help='Keep a single gedit instance open and open/close files as tabs in it (gui backend).')),
+    'spool': (['--spool'], dict(type=str, default=None, help='Directory of a spool of texts and filenames generated in the background ahead of time (kept between restarts).')),
+    'spool-size': (['--spool-size'], dict(type=int, default=100, help='Number of documents to keep ready in the spool.')),
+    'max-actions': (['--max-actions'], dict(type=int, default=0, help='Stop after this number of actions (0 means no limit).')),
+    'scheduler': (['--scheduler'], dict(type=str, default='sequential', choices=SCHEDULERS, help='Run the actions one after another, or as asyncio tasks with deadlines (only the actions that need the display are serialized).')),
+    'concurrency': (['--concurrency'], dict(type=int, default=4, help='Maximum number of actions running at once with the async scheduler.')),
+    'deadline': (['--deadline'], dict(type=float, default=600, help='Seconds after which an action is cancelled and its gedit killed with the async scheduler (0 means no deadline).')),
+
+    # Plan and replay
+    'actions': (['--actions', '-n'], dict(type=int, default=1000, help='Number of actions to plan.')),
+    'timing': (['--timing'], dict(type=str, choices=['asap', 'recorded'], default='asap', help='Execute the actions as fast as possible or keeping the recorded time between them.')),
+    'speed': (['--speed'], dict(type=float, default=1, help='Speed factor of the recorded timing.')),
+    'rebase': (['--rebase'], dict(type=str, nargs=2, metavar=('FROM', 'TO'), help='Replace the directory FROM by TO in the recorded paths.')),
+
+    # Train
+    'corpus': (['--corpus', '-C'], dict(type=str, required=True, help='Directory with the texts (.txt and .md files, recursively) to learn from.')),
+    'order': (['--order'], dict(type=int, default=2, help='Number of previous words that determine the next one.')),
+
+    # Seed
+    'count': (['--count', '-n'], dict(type=int, required=True, help='Number of documents to create.')),
+    'processes': (['--workers'], dict(type=int, default=0, help='Number of worker processes (0 means one per CPU).')),
+    'backdate': (['--backdate'], dict(type=float, default=0, help='Spread the modification and access times of the documents over this many past days (0 keeps the current time).')),
+
+    # Summary
+    'paths': (['paths'], dict(type=str, nargs='*', help='Log files or directories (searched recursively, e.g. the log directory of a supervisor). The log directory by default.')),
+    'top': (['--top'], dict(type=int, default=10, help='Number of most common errors to show.')),
+    'json': (['--json'], dict(action='store_true', help='Print the report as JSON.')),
+
+    # Supervise
+    'workers': (['--workers', '-n'], dict(type=int, default=2, help='Number of daemons (simulated users) to run.')),
+    'xvfb': (['--xvfb'], dict(action='store_true', help='Start an Xvfb display for each worker (required by more than one worker, unless --backend file).')),
+    'display-base': (['--display-base'], dict(type=int, default=100, help='Display number of the first worker when using --xvfb.')),
+    'screen': (['--screen'], dict(type=str, default='1920x1080x24', help='Screen geometry of the Xvfb displays.')),
+    'restart': (['--restart'], dict(action='store_true', help='Restart the workers that exit with an error.')),
+}
+
+LOG_ARGUMENTS = ['log', 'debug', 'log-format', 'log-max-bytes', 'log-rotate-hours', 'log-backups', 'log-compress']
+METRICS_ARGUMENTS = ['metrics', 'profile']
+REPRODUCIBILITY_ARGUMENTS = ['seed', 'trace', 'trace-content']
+ARRIVAL_ARGUMENTS = ['arrival', 'rate', 'working-hours']
+TEXT_ARGUMENTS = ['min-paragraphs', 'max-paragraphs', 'min-sentences', 'max-sentences', 'min-words', 'max-words']
+FILENAME_ARGUMENTS = ['min-filename-length', 'max-filename-length']
+GENERATION_ARGUMENTS = ['text-generation', 'model']
+TYPING_ARGUMENTS = ['interval-between-keystrokes', 'typing', 'typing-budget', 'wpm', 'typo-rate', 'typing-profile']
+HEALTH_ARGUMENTS = ['health', 'max-gedit', 'max-slowdown', 'stuck-age']
+BACKEND_ARGUMENTS = ['backend', 'window-class', 'window-timeout', *HEALTH_ARGUMENTS]
+POOL_ARGUMENTS = ['extensions', 'recursive', 'selection', 'input']
+RANDOM_ARGUMENTS = [
+    'execution', 'create', 'edit', 'view', 'delete', 'backend', *HEALTH_ARGUMENTS, *LOG_ARGUMENTS,
+    ('extensions', dict(help='Comma-separated extensions of the files to view, edit or delete (e.g. ".txt,.md").')),
+    'recursive', 'selection',
+    ('input', dict(help='Input directory to read files from.')),
+    ('output', dict(help='Output directory to save files to.')),
+]
+
+VERBS = ['create', 'view', 'edit', 'delete']
+COMMANDS = {
+    'create': dict(
+        help='Create a random text file',
+        arguments=[*TEXT_ARGUMENTS, *FILENAME_ARGUMENTS, *TYPING_ARGUMENTS, 'interval-between-keystrokes-filepath', *GENERATION_ARGUMENTS,
+                   *BACKEND_ARGUMENTS, *LOG_ARGUMENTS, *METRICS_ARGUMENTS, *REPRODUCIBILITY_ARGUMENTS, 'output'],
+    ),
+    'view': dict(
+        help='View the content of a file',
+        arguments=['min-time', 'max-time', 'time', *BACKEND_ARGUMENTS, *LOG_ARGUMENTS, *METRICS_ARGUMENTS, *REPRODUCIBILITY_ARGUMENTS, *POOL_ARGUMENTS],
+    ),
+    'edit': dict(
+        help='Edit an existing file and save changes',
+        arguments=[*TEXT_ARGUMENTS, *TYPING_ARGUMENTS, *GENERATION_ARGUMENTS, *BACKEND_ARGUMENTS, *LOG_ARGUMENTS, *METRICS_ARGUMENTS,
+                   *REPRODUCIBILITY_ARGUMENTS, 'edit-strategy', 'max-file-size', 'size-policy', *POOL_ARGUMENTS],
+    ),
+    'delete': dict(
+        help='Delete a file',
+        arguments=['backend', *LOG_ARGUMENTS, *METRICS_ARGUMENTS, *REPRODUCIBILITY_ARGUMENTS, *POOL_ARGUMENTS],
+    ),
+    'random': dict(
+        help='Execute a random command based on provided probabilities',
+        arguments=[*RANDOM_ARGUMENTS, *METRICS_ARGUMENTS, *REPRODUCIBILITY_ARGUMENTS, 'remaining_args'],
+        verbs=True,
+    ),
+    'daemon': dict(
+        help='Keep running and execute random commands based on provided probabilities',
+        arguments=[*RANDOM_ARGUMENTS, *METRICS_ARGUMENTS, *REPRODUCIBILITY_ARGUMENTS, *ARRIVAL_ARGUMENTS,
+                   'reuse-session', 'spool', 'spool-size', 'max-actions', 'scheduler', 'concurrency', 'deadline'],
+        verbs=True,
+    ),
+    'plan': dict(
+        help='Generate a plan of random actions (a trace) without executing it',
+        arguments=[*RANDOM_ARGUMENTS, *ARRIVAL_ARGUMENTS, 'actions',
+                   ('seed', dict(help='Seed of the random generator.')),
+                   ('trace-content', dict(help='Record the generated text itself or only its hash and length in the plan.')),
+                   ('trace_file', dict(help='File to write the plan to.'))],
+        verbs=True,
+    ),
+    'replay': dict(
+        help='Execute the actions recorded in a trace (or a plan)',
+        arguments=['backend', 'timing', 'speed', 'rebase',
+                   ('interval-between-keystrokes', dict(help='Interval (in seconds) between keystrokes when writing the recorded text.')),
+                   ('typing', dict(help='Typing strategy (see create).')), 'wpm', 'typo-rate', 'typing-profile',
+                   *LOG_ARGUMENTS, *METRICS_ARGUMENTS, 'trace_file'],
+    ),
+    'train': dict(
+        help='Build the Markov model used by --text-generation markov from a corpus of texts',
+        arguments=['corpus', 'order', ('model', dict(help='File to save the model to.')), *LOG_ARGUMENTS],
+    ),
+    'seed': dict(
+        help='Create many documents at once directly on disk (e.g. to seed a new image)',
+        arguments=['count', ('output', dict(help='Output directory to save files to. If it does not exist, it will be created.')),
+                   *TEXT_ARGUMENTS, *FILENAME_ARGUMENTS, *GENERATION_ARGUMENTS, 'processes', 'backdate',
+                   ('working-hours', dict(default=None, help='Hours of the day (START-END) of the backdated modification times (9-17 by default).')),
+                   ('seed', dict(help='Seed of the random generator, to create the same documents again.')),
+                   *LOG_ARGUMENTS],
+    ),
+    'summary': dict(
+        help='Report the latency and the errors of the actions from the JSON-lines logs',
+        arguments=['paths', 'top', 'json', 'log', 'debug'],
+    ),
+    'supervise': dict(
+        help='Run several daemons in parallel, each one on its own display (any other argument is passed to the daemons)',
+        arguments=['workers', 'xvfb', 'display-base', 'screen', 'restart',
+                   ('log', dict(help='Log directory, each worker logs into its own subdirectory. If it does not exist, it will be created.')),
+                   'debug',
+                   ('input', dict(help='Input directory, each worker reads files from its own subdirectory.')),
+                   ('output', dict(help='Output directory, each worker saves files to its own subdirectory.'))],
+    ),
+}
+
+
+def add_command_parser(subparsers: argparse._SubParsersAction, command: str) -> argparse.ArgumentParser:
+    # No abbreviations: random parses its whole command line again with the parser of the verb, where
+    # e.g. its --edit would otherwise be taken for --edit-strategy
+    command_parser = subparsers.add_parser(command, help=COMMANDS[command]['help'], allow_abbrev=False)
+    added = set()
+    for argument in COMMANDS[command]['arguments']:
+        name, overrides = argument if isinstance(argument, tuple) else (argument, {})
+        flags, options = ARGUMENTS[name]
+        command_parser.add_argument(*flags, **{**options, **overrides})
+        added.add(name)
+
+    if COMMANDS[command].get('verbs'):
+        for verb in VERBS:
+            for argument in COMMANDS[verb]['arguments']:
+                name = argument[0] if isinstance(argument, tuple) else argument
+                if name not in added:
+                    flags, options = ARGUMENTS[name]
+                    command_parser.add_argument(*flags, **{**options, 'help': argparse.SUPPRESS})
+                    added.add(name)
+    return command_parser
+
+
+def build_parser(commands: Optional[List[str]] = None) -> Tuple[argparse.ArgumentParser, argparse._SubParsersAction]:
+    # Only the given commands (all of them by default), building the whole tree costs more than running a no-op
     parser = argparse.ArgumentParser(
         prog='gedit-simulation',
         description='Simulate activity in gedit, writing, editing, viewing and deleting files.',
     )
-    # parser.add_argument('args', nargs=argparse.REMAINDER)
-
-
-    # Subcommands
     subparsers = parser.add_subparsers(dest='command', required=True, help='Command to execute')
+    for command in COMMANDS:
+        if commands is None or command in commands:
+            add_command_parser(subparsers, command)
+    return parser, subparsers
+
+
+def execute_command(
+        args: argparse.Namespace,
+        words: Optional[List[str]] = None,
+        backend: Optional[Backend] = None,
+        spool: Optional[ContentSpool] = None,
+        one_shot: bool = False
+    ):
+    backend = backend or create_backend(args)
+    record = None
+    try:
+        with metrics.action(args.command) as record:
+            run_command(args, words, backend, spool, one_shot)
+    except (ActionTimeout, ActionSkipped):
+        raise
+    except ActionError:
+        # Do not leave its gedit behind, also when the process exits right after
+        backend.recover()
+        raise
+    finally:
+        export_metrics(args, record)
+        write_trace(args, record)
+        log_action(record)
+
+
+def run_command(
+        args: argparse.Namespace,
+        words: Optional[List[str]] = None,
+        backend: Optional[Backend] = None,
+        spool: Optional[ContentSpool] = None,
+        one_shot: bool = False
+    ):
+    # one_shot: the process exits after this action (random, view, edit and delete from the command line)
+    backend = backend or create_backend(args)
+    model = None
+    if getattr(args, 'text_generation', 'random') == 'markov':
+        model = load_markov_model(args.model)
 
-    # Subcommand create
-    create_parser = subparsers.add_parser('create', help='Create a random text file')
-    create_parser.add_argument('--min-paragraphs', '-p', type=int, default=2, help='Minimum number of paragraphs to generate.')
-    create_parser.add_argument('--max-paragraphs', '-P', type=int, default=4, help='Maximum number of paragraphs to generate.')
-    create_parser.add_argument('--min-sentences', '-s', type=int, default=2, help='Minimum number of sentences per paragraph.')
-    create_parser.add_argument('--max-sentences', '-S', type=int, default=10, help='Maximum number of sentences per paragraph.')
-    create_parser.add_argument('--min-words', '-w', type=int, default=4, help='Minimum number of words per sentence.')
-    create_parser.add_argument('--max-words', '-W', type=int, default=15, help='Maximum number of words per sentence.')
-    create_parser.add_argument('--min-filename-length', type=int, default=4, help='Minimum length of the generated filename.')
-    create_parser.add_argument('--max-filename-length', type=int, default=8, help='Maximum length of the generated filename.')
-    create_parser.add_argument('--interval-between-keystrokes', type=float, default=0.025, help='Interval (in seconds) between keystrokes when writing the generated text.')
-    create_parser.add_argument('--interval-between-keystrokes-filepath', type=float, default=0.025, help='Interval (in seconds) between keystrokes when writing the filepath.')
-    create_parser.add_argument('--text-generation', type=str, choices=['random'], default='random', help='Text generation method.')
-    create_parser.add_argument('--debug', action='store_true', help='Enable debug mode.')
-    create_parser.add_argument('--log', type=str, help='Log directory to save log files to. If it does not exist, it will be created.', default=path)
-    create_parser.add_argument('--output', '-O', type=str, required=True, help='Output directory to save files to. If not a directory, it will be used as a filename.')
-
-    # Subcommand view
-    view_parser = subparsers.add_parser('view', help='View the content of a file')
-    view_parser.add_argument('--min-time', type=int, default=30, help='Minimum time (in seconds) to view the file.')
-    view_parser.add_argument('--max-time', type=int, default=30, help='Maximum time (in seconds) to view the file.')
-    view_parser.add_argument('--time', '-t', type=int, help='Fixed time (in seconds) to view the file. Overrides --min-time and --max-time.')
-    view_parser.add_argument('--debug', action='store_true', help='Enable debug mode.')
-    view_parser.add_argument('--log', type=str, help='Log directory to save log files to. If it does not exist, it will be created.', default=path)
-    view_parser.add_argument('--input', '-I', type=str, required=True, help='Input directory to read files from. If it is a file, it will be used as a filename.')
-
-    # Subcommand edit
-    edit_parser = subparsers.add_parser('edit', help='Edit an existing file and save changes')
-    edit_parser.add_argument('--min-paragraphs', type=int, default=2, help='Minimum number of paragraphs to generate.')
-    edit_parser.add_argument('--max-paragraphs', type=int, default=4, help='Maximum number of paragraphs to generate.')
-    edit_parser.add_argument('--min-sentences', type=int, default=2, help='Minimum number of sentences per paragraph.')
-    edit_parser.add_argument('--max-sentences', type=int, default=10, help='Maximum number of sentences per paragraph.')
-    edit_parser.add_argument('--min-words', type=int, default=4, help='Minimum number of words per sentence.')
-    edit_parser.add_argument('--max-words', type=int, default=15, help='Maximum number of words per sentence.')
-    edit_parser.add_argument('--interval-between-keystrokes', type=float, default=0.025, help='Interval (in seconds) between keystrokes when writing the generated text.')
-    edit_parser.add_argument('--text-generation', type=str, choices=['random'], default='random', help='Text generation method.')
-    edit_parser.add_argument('--debug', action='store_true', help='Enable debug mode.')
-    edit_parser.add_argument('--log', type=str, help='Log directory to save log files to. If it does not exist, it will be created.', default=path)
-    edit_parser.add_argument('--input', '-I', type=str, required=True, help='Input directory to read files from. If it is a file, it will be used as a filename.')
-    # edit_parser.add_argument('--output', '-O', type=str, required=True, help='Output directory to save files to. If not a directory, it will be used as a filename.')
-
-    # Subcommand delete
-    delete_parser = subparsers.add_parser('delete', help='Delete a file')
-    delete_parser.add_argument('--log', type=str, help='Log directory to save log files to. If it does not exist, it will be created.', default=path)
-    delete_parser.add_argument('--debug', action='store_true', help='Enable debug mode.')
-    delete_parser.add_argument('--input', '-I', type=str, required=True, help='Input directory to read files from. If it is a file, it will be used as a filename.')
-
-    # Subcommand random
-    random_parser = subparsers.add_parser('random', help='Execute a random command based on provided probabilities')
-    random_parser.add_argument('--execution', type=int, default=100, help='Probability (in %%) of execution of any verb.')
-    random_parser.add_argument('--create', '-c', type=int, default=50, help='Probability (in %%) of executing "create".')
-    random_parser.add_argument('--edit', '-e', type=int, default=20, help='Probability (in %%) of executing "edit".')
-    random_parser.add_argument('--view', '-v', type=int, default=20, help='Probability (in %%) of executing "view".')
-    random_parser.add_argument('--delete', '-d', type=int, default=10, help='Probability (in %%) of executing "delete".')
-    random_parser.add_argument('--log', type=str, help='Log directory to save log files to. If it does not exist, it will be created.', default=path)
-    random_parser.add_argument('--debug', action='store_true', help='Enable debug mode.')
-    random_parser.add_argument('--input', '-I', type=str, required=True, help='Input directory to read files from.', )
-    random_parser.add_argument('--output', '-O', type=str, required=True, help='Output directory to save files to.')
-
-    # TODO: try to use nargs=argparse.REMAINDER or something similar to capture the remaining arguments without specifying them here again
-    random_parser.add_argument('--min-paragraphs', '-p', type=int, default=2, help=argparse.SUPPRESS)
-    random_parser.add_argument('--max-paragraphs', '-P', type=int, default=4, help=argparse.SUPPRESS)
-    random_parser.add_argument('--min-sentences', '-s', type=int, default=2, help=argparse.SUPPRESS)
-    random_parser.add_argument('--max-sentences', '-S', type=int, default=10, help=argparse.SUPPRESS)
-    random_parser.add_argument('--min-words', '-w', type=int, default=4, help=argparse.SUPPRESS)
-    random_parser.add_argument('--max-words', '-W', type=int, default=15, help=argparse.SUPPRESS)
-    random_parser.add_argument('--min-filename-length', type=int, default=4, help=argparse.SUPPRESS)
-    random_parser.add_argument('--max-filename-length', type=int, default=8, help=argparse.SUPPRESS)
-    random_parser.add_argument('--interval-between-keystrokes', type=float, default=0.025, help=argparse.SUPPRESS)
-    random_parser.add_argument('--interval-between-keystrokes-filepath', type=float, default=0.025, help=argparse.SUPPRESS)
-    random_parser.add_argument('--text-generation', type=str, choices=['random'], default='random', help=argparse.SUPPRESS)
-    random_parser.add_argument('--min-time', type=int, default=30, help=argparse.SUPPRESS)
-    random_parser.add_argument('--max-time', type=int, default=30, help=argparse.SUPPRESS)
-    random_parser.add_argument('--time', '-t', type=int, default=None, help=argparse.SUPPRESS)
-
-    random_parser.add_argument('remaining_args', nargs=argparse.REMAINDER, help='Remaining arguments for the selected command (see help for each command).')
-
-    # Parse arguments
-    # args = parser.parse_args()
-    args, unknown = parser.parse_known_args()
-
-    file_handler = RotatingFileHandler(
-        os.path.join(os.path.expanduser(args.log), 'gedit-simulation.log'),
-        maxBytes=1024*1024, 
-        backupCount=3
-    )
-    file_handler.setFormatter(formatter)
-    file_handler.setLevel(logging.INFO)
-    logger.addHandler(file_handler)
-
-    if args.debug:
-        logger.setLevel(logging.DEBUG)
-        console_handler.setLevel(logging.DEBUG)
-        file_handler.setLevel(logging.DEBUG)
-    else:
-        logger.setLevel(logging.INFO)
-    logger.info("Starting gedit-simulation")
-    if unknown:
-        logger.warning(f"Unknown arguments ignored: {unknown}")
-
-    # In case of random command, choose a random command based on the probabilities
-    if args.command == 'random':
-        args = random_execution(args, subparsers)
-    else:
-        logger.debug(f'Chosen command "{args.command}" with args: {args}')
-
-    
     # Sanitize the input directory (expand user)
+    pool = None
     if args.command in ['view', 'edit', 'delete']:
         args.input = os.path.expanduser(args.input)
-    
+        if not is_file_path(args.input):
+            ordered = getattr(args, 'seed', None) is not None
+            if one_shot and not args.recursive and args.selection == 'uniform':
+                pool = DirectoryListing(args.input, args.extensions, ordered)
+            else:
+                pool = get_file_pool(args.input, args.extensions, args.recursive, args.selection, ordered)
+
     if args.command == 'create':
         create_process(
             args.output,
@@ -482,7 +3682,11 @@ def main():
             args.max_words,
             args.min_filename_length,
             args.max_filename_length,
-            args.interval_between_keystrokes
+            args.interval_between_keystrokes,
+            words,
+            backend,
+            spool,
+            model
         )
     elif args.command == 'edit':
         edit_process(
@@ -493,16 +3697,113 @@ def main():
             args.max_sentences,
             args.min_words,
             args.max_words,
-            args.interval_between_keystrokes
+            args.interval_between_keystrokes,
+            words,
+            backend,
+            pool,
+            spool,
+            model,
+            getattr(args, 'edit_strategy', 'append'),
+            getattr(args, 'max_file_size', 0),
+            getattr(args, 'size_policy', 'rotate')
         )
     elif args.command == 'view':
-        view_process(args.input, args.min_time, args.max_time, args.time)
+        view_process(args.input, args.min_time, args.max_time, args.time, backend, pool)
     elif args.command == 'delete':
-        delete_process(args.input)
+        delete_process(args.input, backend, pool)
     else:
         logger.error(f'Unknown command "{args.command}". Exiting.')
         exit(1)
-    logger.info("Finishing gedit-simulation")
+
+
+def main():
+    # The command is the first positional argument, only its parser is built (random builds the one
+    # of the chosen verb later)
+    command = next((argument for argument in sys.argv[1:] if not argument.startswith('-')), None)
+    parser, subparsers = build_parser([command] if command in COMMANDS else None)
+
+    # Parse arguments
+    # args = parser.parse_args()
+    args, unknown = parser.parse_known_args()
+
+    if getattr(args, 'seed', None) is not None:
+        random.seed(args.seed)
+
+    # Most random runs (from cron) do nothing: they exit before setting up the logging
+    if args.command == 'random' and random.random() > args.execution / 100:
+        print("Due to the probabilities, the command will not be executed.")
+        exit(0)
+
+    file_handler = setup_logging(args)
+    file_handler.setLevel(logging.INFO)
+
+    if args.debug:
+        logger.setLevel(logging.DEBUG)
+        console_handler.setLevel(logging.DEBUG)
+        file_handler.setLevel(logging.DEBUG)
+    else:
+        logger.setLevel(logging.INFO)
+    logger.info("Starting gedit-simulation")
+    if args.command == 'supervise':
+        supervise_execution(args, unknown)
+        logger.info("Finishing gedit-simulation")
+        return
+    if unknown:
+        logger.warning(f"Unknown arguments ignored: {unknown}")
+
+    if args.command == 'plan':
+        plan_execution(args)
+        logger.info("Finishing gedit-simulation")
+        return
+    if args.command == 'train':
+        build_markov_model(args.corpus, os.path.expanduser(args.model), args.order)
+        logger.info("Finishing gedit-simulation")
+        return
+    if args.command == 'seed':
+        seed_execution(args)
+        logger.info("Finishing gedit-simulation")
+        return
+    if args.command == 'summary':
+        summary_execution(args)
+        logger.info("Finishing gedit-simulation")
+        return
+
+    profiler = None
+    if args.profile:
+        import cProfile
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+
+    try:
+        # In case of random command, choose a random command based on the probabilities
+        if args.command == 'random':
+            args = random_execution(args, subparsers)
+        elif args.command == 'daemon':
+            daemon_execution(args)
+            logger.info("Finishing gedit-simulation")
+            return
+        elif args.command == 'replay':
+            replay_execution(args)
+            logger.info("Finishing gedit-simulation")
+            return
+        else:
+            logger.debug(f'Chosen command "{args.command}" with args: {args}')
+
+        try:
+            execute_command(args, one_shot=True)
+        except ActionSkipped as e:
+            logger.warning(f'Command "{args.command}" skipped: {e}')
+        except ActionError as e:
+            logger.error(f'Command "{args.command}" failed: {e}')
+            exit(1)
+        logger.info("Finishing gedit-simulation")
+    finally:
+        if profiler:
+            profiler.disable()
+            profile_file = os.path.join(os.path.expanduser(args.log), PROFILE_FILE)
+            profiler.dump_stats(profile_file)
+            logger.info(f"Profile saved to {profile_file}")
 
 
 if __name__ == '__main__':